@@ -1,14 +1,25 @@
 import time
+import queue
 import threading
 from core.database import SessionLocal
 from models.stream import Stream
-from services.video_processor import process_stream
+from services.partition_manager import maintain_partitions
+from services.worker_pool import WorkerPool
+from services.control_channel import control_channel
+from services.cpu_budget import cpu_budget
+from core.config import settings
 import asyncio
 
 # Keep track of running threads
 running_threads = {} # stream_id -> Thread
 
+# Process mode: streams sharded across worker processes
+worker_pool = None
+
 def run_processor(stream_id):
+    # Imported lazily so process mode never loads models in the orchestrator
+    from services.video_processor import process_stream
+
     # Wrapped in a new event loop for each thread
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
@@ -19,40 +30,99 @@ def run_processor(stream_id):
     finally:
         loop.close()
 
+def launch_threads(active_streams):
+    # Start new threads
+    for stream in active_streams:
+        s_id = str(stream.id)
+        if s_id not in running_threads or not running_threads[s_id].is_alive():
+            print(f"[+] Launching Neural Thread for: {stream.name}")
+            thread = threading.Thread(target=run_processor, args=(s_id,), daemon=True)
+            thread.start()
+            running_threads[s_id] = thread
+    
+    # Streams that are no longer active (stop event missed or erased): signal
+    # their threads; the control flag is checked on every frame and after connecting
+    active_ids = {str(stream.id) for stream in active_streams}
+    stale = [sid for sid, t in running_threads.items() if sid not in active_ids and t.is_alive()]
+    if stale:
+        from services.video_processor import control
+        for sid in stale:
+            print(f"[*] Stopping inactive stream thread: {sid}")
+            control.stop(sid)
+
+    # Clean up tracking dict
+    dead_threads = [sid for sid, t in running_threads.items() if not t.is_alive()]
+    for sid in dead_threads:
+        del running_threads[sid]
+    cpu_budget.set_streams(len(running_threads))
+
 def orchestrate():
+    global worker_pool
+
     print("=" * 60)
-    print("SENTINEL AI - MULTI-THREADED ORCHESTRATOR")
+    if settings.WORKER_MODE == "process":
+        print(f"SENTINEL AI - MULTI-PROCESS ORCHESTRATOR ({settings.WORKER_PROCESSES} workers)")
+        worker_pool = WorkerPool(settings.WORKER_PROCESSES)
+    else:
+        print("SENTINEL AI - MULTI-THREADED ORCHESTRATOR")
+        # Streams run in this process: size its inference pools before models load
+        cpu_budget.configure(0)
     print("=" * 60)
     
+    # Control events wake the loop immediately; the periodic query is only
+    # a safety-net reconcile in case an event was lost
+    wake = queue.Queue()
+    control_channel.subscribe(lambda event: wake.put(event) if event.get("type") in ("stream", "resync") else None)
+
+    last_maintenance = 0.0
+    last_reconcile = 0.0
+    active_streams = []
+    refresh = True
     while True:
-        db = SessionLocal()
+        # Partition premake + retention (drops whole days, no DELETE)
+        if time.time() - last_maintenance >= settings.PARTITION_MAINTENANCE_INTERVAL:
+            maintain_partitions()
+            last_maintenance = time.time()
+
+        refresh = refresh or time.time() - last_reconcile >= settings.CONTROL_RECONCILE_INTERVAL
+        if refresh:
+            db = SessionLocal()
+            try:
+                active_streams = db.query(Stream).filter(Stream.status == "active").all()
+                last_reconcile = time.time()
+            except Exception as e:
+                print(f"[!] Orchestrator Error: {e}")
+                db.rollback()
+            finally:
+                db.close()
+
         try:
-            active_streams = db.query(Stream).filter(Stream.status == "active").all()
-            
-            # Start new threads
-            for stream in active_streams:
-                s_id = str(stream.id)
-                if s_id not in running_threads or not running_threads[s_id].is_alive():
-                    print(f"[+] Launching Neural Thread for: {stream.name}")
-                    thread = threading.Thread(target=run_processor, args=(s_id,), daemon=True)
-                    thread.start()
-                    running_threads[s_id] = thread
-            
-            # Clean up tracking dict
-            dead_threads = [sid for sid, t in running_threads.items() if not t.is_alive()]
-            for sid in dead_threads:
-                del running_threads[sid]
-                
+            if worker_pool is not None:
+                if refresh:
+                    worker_pool.sync({str(stream.id) for stream in active_streams})
+                else:
+                    worker_pool.check()
+            elif refresh:
+                launch_threads(active_streams)
         except Exception as e:
             print(f"[!] Orchestrator Error: {e}")
-            db.rollback()
-        finally:
-            db.close()
-            
-        time.sleep(5)
+
+        # Wait for a control event; the short timeout only drives worker
+        # health checks, not DB queries
+        try:
+            event = wake.get(timeout=5)
+            print(f"[*] Control event: {event.get('action', event['type'])} {event.get('stream_id', '')}")
+            # Coalesce bursts (e.g. starting many streams at once) into one reconcile
+            while not wake.empty():
+                wake.get_nowait()
+            refresh = True
+        except queue.Empty:
+            refresh = False
 
 if __name__ == "__main__":
     try:
         orchestrate()
     except KeyboardInterrupt:
         print("\n[!] Orchestrator SIGINT received. Shutting down...")
+        if worker_pool is not None:
+            worker_pool.shutdown()
@@ -0,0 +1,56 @@
+"""Add event rollups table
+
+Revision ID: 3c9d5e8f1a27
+Revises: b7e2c41d9a06
+Create Date: 2026-10-18 11:03:52.640117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9d5e8f1a27'
+down_revision: Union[str, None] = 'b7e2c41d9a06'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('event_rollups',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('stream_id', sa.UUID(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('label', sa.String(length=100), nullable=False),
+    sa.Column('granularity', sa.String(length=10), nullable=False),
+    sa.Column('bucket', sa.DateTime(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['stream_id'], ['streams.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('granularity', 'bucket', 'stream_id', 'kind', 'label', name='uix_rollup_key')
+    )
+    op.create_index('ix_event_rollups_kind_granularity_bucket', 'event_rollups', ['kind', 'granularity', 'bucket'])
+
+    # Seed rollups from existing raw rows
+    for granularity in ('minute', 'hour', 'day'):
+        op.execute(f"""
+            INSERT INTO event_rollups (id, stream_id, kind, label, granularity, bucket, count)
+            SELECT gen_random_uuid(), stream_id, 'detection', object_class, '{granularity}',
+                   date_trunc('{granularity}', timestamp), count(*)
+            FROM detections WHERE stream_id IS NOT NULL
+            GROUP BY 2, 4, 6
+        """)
+        op.execute(f"""
+            INSERT INTO event_rollups (id, stream_id, kind, label, granularity, bucket, count)
+            SELECT gen_random_uuid(), stream_id, 'alert', alert_type, '{granularity}',
+                   date_trunc('{granularity}', created_at), count(*)
+            FROM alerts WHERE stream_id IS NOT NULL
+            GROUP BY 2, 4, 6
+        """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_event_rollups_kind_granularity_bucket', table_name='event_rollups')
+    op.drop_table('event_rollups')
@@ -0,0 +1,31 @@
+"""Add track columns to detections
+
+Revision ID: 5a1f7c3e9b42
+Revises: 3c9d5e8f1a27
+Create Date: 2026-10-18 12:41:09.318274
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a1f7c3e9b42'
+down_revision: Union[str, None] = '3c9d5e8f1a27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Columns and index on the partitioned parent propagate to every partition
+    op.add_column('detections', sa.Column('track_id', sa.UUID(), nullable=True))
+    op.add_column('detections', sa.Column('event', sa.String(length=10), nullable=True))
+    op.create_index('ix_detections_track_id', 'detections', ['track_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_detections_track_id', table_name='detections')
+    op.drop_column('detections', 'event')
+    op.drop_column('detections', 'track_id')
@@ -0,0 +1,130 @@
+"""Partition detections and alerts by day and add query indexes
+
+Revision ID: b7e2c41d9a06
+Revises: 824de8309433
+Create Date: 2026-10-18 10:12:40.218334
+
+"""
+from datetime import date, timedelta
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2c41d9a06'
+down_revision: Union[str, None] = '824de8309433'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PREMAKE_DAYS = 7
+
+DETECTION_COLUMNS = "id, stream_id, timestamp, object_class, confidence, bbox_json, frame_number"
+ALERT_COLUMNS = ("id, stream_id, alert_type, severity, description, video_clip_url, thumbnail_url, "
+                 "resolved, resolved_by, resolved_at, created_at")
+
+
+def _create_daily_partitions(table: str, key: str, legacy: str) -> None:
+    conn = op.get_bind()
+    first = conn.execute(sa.text(f'SELECT min("{key}")::date FROM {legacy}')).scalar()
+    today = date.today()
+    day = min(first, today) if first else today
+    while day <= today + timedelta(days=PREMAKE_DAYS):
+        op.execute(
+            f"CREATE TABLE {table}_p{day:%Y%m%d} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')"
+        )
+        day += timedelta(days=1)
+    # Catches rows outside the premade range; partition maintenance moves them
+    # into their dated partition when it is created and applies retention to it
+    op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+
+
+def upgrade() -> None:
+    # detections: PARTITION BY RANGE (timestamp), PK must include the key
+    op.rename_table('detections', 'detections_legacy')
+    op.execute("ALTER TABLE detections_legacy RENAME CONSTRAINT detections_pkey TO detections_legacy_pkey")
+    op.execute("""
+        CREATE TABLE detections (
+            id UUID NOT NULL,
+            stream_id UUID REFERENCES streams (id) ON DELETE CASCADE,
+            timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            object_class VARCHAR(100) NOT NULL,
+            confidence FLOAT NOT NULL,
+            bbox_json JSON NOT NULL,
+            frame_number INTEGER,
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+    """)
+    _create_daily_partitions('detections', 'timestamp', 'detections_legacy')
+    op.execute(f"INSERT INTO detections ({DETECTION_COLUMNS}) SELECT {DETECTION_COLUMNS} FROM detections_legacy")
+    op.drop_table('detections_legacy')
+    op.create_index('ix_detections_stream_id_timestamp', 'detections', ['stream_id', 'timestamp'])
+    op.create_index('ix_detections_timestamp_object_class', 'detections', ['timestamp', 'object_class'])
+
+    # alerts: PARTITION BY RANGE (created_at)
+    op.rename_table('alerts', 'alerts_legacy')
+    op.execute("ALTER TABLE alerts_legacy RENAME CONSTRAINT alerts_pkey TO alerts_legacy_pkey")
+    op.execute("UPDATE alerts_legacy SET created_at = now() WHERE created_at IS NULL")
+    op.execute("""
+        CREATE TABLE alerts (
+            id UUID NOT NULL,
+            stream_id UUID REFERENCES streams (id) ON DELETE CASCADE,
+            alert_type VARCHAR(100) NOT NULL,
+            severity VARCHAR(20) NOT NULL,
+            description TEXT NOT NULL,
+            video_clip_url TEXT,
+            thumbnail_url TEXT,
+            resolved BOOLEAN,
+            resolved_by UUID REFERENCES users (id),
+            resolved_at TIMESTAMP WITHOUT TIME ZONE,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    _create_daily_partitions('alerts', 'created_at', 'alerts_legacy')
+    op.execute(f"INSERT INTO alerts ({ALERT_COLUMNS}) SELECT {ALERT_COLUMNS} FROM alerts_legacy")
+    op.drop_table('alerts_legacy')
+    op.create_index('ix_alerts_stream_id_created_at', 'alerts', ['stream_id', 'created_at'])
+    op.create_index('ix_alerts_created_at', 'alerts', ['created_at'])
+
+
+def downgrade() -> None:
+    # Back to plain heap tables; data is copied out of the partitions
+    op.rename_table('detections', 'detections_partitioned')
+    op.create_table('detections',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('stream_id', sa.UUID(), nullable=True),
+    sa.Column('timestamp', sa.DateTime(), nullable=False),
+    sa.Column('object_class', sa.String(length=100), nullable=False),
+    sa.Column('confidence', sa.Float(), nullable=False),
+    sa.Column('bbox_json', sa.JSON(), nullable=False),
+    sa.Column('frame_number', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['stream_id'], ['streams.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id', name='detections_plain_pkey')
+    )
+    op.execute(f"INSERT INTO detections ({DETECTION_COLUMNS}) SELECT {DETECTION_COLUMNS} FROM detections_partitioned")
+    op.execute("DROP TABLE detections_partitioned CASCADE")
+    op.execute("ALTER TABLE detections RENAME CONSTRAINT detections_plain_pkey TO detections_pkey")
+
+    op.rename_table('alerts', 'alerts_partitioned')
+    op.create_table('alerts',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('stream_id', sa.UUID(), nullable=True),
+    sa.Column('alert_type', sa.String(length=100), nullable=False),
+    sa.Column('severity', sa.String(length=20), nullable=False),
+    sa.Column('description', sa.Text(), nullable=False),
+    sa.Column('video_clip_url', sa.Text(), nullable=True),
+    sa.Column('thumbnail_url', sa.Text(), nullable=True),
+    sa.Column('resolved', sa.Boolean(), nullable=True),
+    sa.Column('resolved_by', sa.UUID(), nullable=True),
+    sa.Column('resolved_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['resolved_by'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['stream_id'], ['streams.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id', name='alerts_plain_pkey')
+    )
+    op.execute(f"INSERT INTO alerts ({ALERT_COLUMNS}) SELECT {ALERT_COLUMNS} FROM alerts_partitioned")
+    op.execute("DROP TABLE alerts_partitioned CASCADE")
+    op.execute("ALTER TABLE alerts RENAME CONSTRAINT alerts_plain_pkey TO alerts_pkey")
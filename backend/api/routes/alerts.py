@@ -1,10 +1,11 @@
 from typing import List, Any, Optional
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
 
 from core import dependencies
-from core.database import get_db
+from core.database import get_async_db
 from models.alert import Alert
 from models.stream import Stream
 from schemas.alert import AlertUpdate, AlertResponse
@@ -13,8 +14,8 @@ from models.user import User
 router = APIRouter()
 
 @router.get("/", response_model=List[AlertResponse])
-def read_alerts(
-    db: Session = Depends(get_db),
+async def read_alerts(
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(dependencies.get_current_active_user),
     skip: int = 0,
     limit: int = 100,
@@ -22,19 +23,19 @@ def read_alerts(
     resolved: Optional[bool] = None,
     stream_id: Optional[UUID] = None
 ) -> Any:
-    query = db.query(Alert, Stream.name.label("stream_name"))\
+    query = select(Alert, Stream.name.label("stream_name"))\
         .join(Stream, Alert.stream_id == Stream.id)
     
     if severity:
-        query = query.filter(Alert.severity == severity)
+        query = query.where(Alert.severity == severity)
     if resolved is not None:
-        query = query.filter(Alert.resolved == resolved)
+        query = query.where(Alert.resolved == resolved)
     if stream_id:
-        query = query.filter(Alert.stream_id == stream_id)
+        query = query.where(Alert.stream_id == stream_id)
         
-    results = query.order_by(Alert.created_at.desc()).offset(skip).limit(limit).all()
+    results = (await db.execute(query.order_by(Alert.created_at.desc()).offset(skip).limit(limit))).all()
     
-    # Flatten the result because query(Alert, Stream.name) returns tuples
+    # Flatten the result because select(Alert, Stream.name) returns tuples
     alerts = []
     for alert, stream_name in results:
         alert_dict = alert.__dict__
@@ -43,13 +44,13 @@ def read_alerts(
     return alerts
 
 @router.patch("/{id}/resolve", response_model=AlertResponse)
-def resolve_alert(
+async def resolve_alert(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     id: UUID,
     current_user: User = Depends(dependencies.get_current_active_user),
 ) -> Any:
-    alert = db.query(Alert).filter(Alert.id == id).first()
+    alert = (await db.execute(select(Alert).where(Alert.id == id))).scalars().first()
     if not alert:
         raise HTTPException(status_code=404, detail="Alert not found")
     
@@ -59,18 +60,18 @@ def resolve_alert(
     alert.resolved_at = datetime.utcnow()
     
     db.add(alert)
-    db.commit()
-    db.refresh(alert)
+    await db.commit()
+    await db.refresh(alert)
     return alert
 
 @router.get("/{id}", response_model=AlertResponse)
-def read_alert(
+async def read_alert(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     id: UUID,
     current_user: User = Depends(dependencies.get_current_active_user),
 ) -> Any:
-    alert = db.query(Alert).filter(Alert.id == id).first()
+    alert = (await db.execute(select(Alert).where(Alert.id == id))).scalars().first()
     if not alert:
         raise HTTPException(status_code=404, detail="Alert not found")
     return alert
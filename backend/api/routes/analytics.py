@@ -1,81 +1,96 @@
 from typing import List, Any
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from sqlalchemy import select, func, desc
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
 
 from core import dependencies
-from core.database import get_db
-from models.detection import Detection
+from core.database import get_async_db
+from models.analytics import EventRollup
 from models.stream import Stream
-from models.alert import Alert
 from models.user import User
 
 router = APIRouter()
 
+# All dashboard aggregates read the incremental rollups (services/rollups.py),
+# never the raw detections table.
+
 @router.get("/summary")
-def get_analytics_summary(
-    db: Session = Depends(get_db),
+async def get_analytics_summary(
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(dependencies.get_current_active_user),
 ) -> Any:
-    # Real aggregation
     today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
     
-    total_detections_today = db.query(func.count(Detection.id)).filter(Detection.timestamp >= today).scalar()
-    total_alerts_today = db.query(func.count(Alert.id)).filter(Alert.created_at >= today).scalar()
+    today_counts = dict((await db.execute(
+        select(EventRollup.kind, func.sum(EventRollup.count))
+        .where(EventRollup.granularity == "day", EventRollup.bucket == today)
+        .group_by(EventRollup.kind)
+    )).all())
     
     # Most active stream
-    most_active = db.query(Stream.name, func.count(Detection.id).label('count'))\
-        .join(Detection)\
-        .group_by(Stream.name)\
-        .order_by(desc('count'))\
-        .first()
+    most_active = (await db.execute(
+        select(Stream.name, func.sum(EventRollup.count).label('count'))
+        .join(EventRollup, EventRollup.stream_id == Stream.id)
+        .where(EventRollup.kind == "detection", EventRollup.granularity == "day")
+        .group_by(Stream.name)
+        .order_by(desc('count'))
+        .limit(1)
+    )).first()
     
     most_active_name = most_active[0] if most_active else "None"
     
     # Simple hour aggregation for peak hour
-    peak_hour_res = db.query(func.extract('hour', Detection.timestamp).label('hour'), func.count(Detection.id).label('count'))\
-        .group_by('hour')\
-        .order_by(desc('count'))\
-        .first()
+    peak_hour_res = (await db.execute(
+        select(func.extract('hour', EventRollup.bucket).label('hour'), func.sum(EventRollup.count).label('count'))
+        .where(EventRollup.kind == "detection", EventRollup.granularity == "hour")
+        .group_by('hour')
+        .order_by(desc('count'))
+        .limit(1)
+    )).first()
     
     peak_hour = int(peak_hour_res[0]) if peak_hour_res else 12
 
     return {
-        "totalDetectionsToday": total_detections_today or 0,
-        "totalAlertsToday": total_alerts_today or 0,
+        "totalDetectionsToday": int(today_counts.get("detection") or 0),
+        "totalAlertsToday": int(today_counts.get("alert") or 0),
         "mostActiveStream": most_active_name,
         "peakHour": peak_hour,
         "automationRate": 94.2 # Mocked for now but based on AI vs manual
     }
 
 @router.get("/detections-timeline")
-def get_detections_timeline(
-    db: Session = Depends(get_db),
+async def get_detections_timeline(
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(dependencies.get_current_active_user),
 ) -> Any:
     # Last 24 hours, grouped by hour
     yesterday = datetime.now() - timedelta(hours=24)
     
-    timeline = db.query(
-        func.date_trunc('hour', Detection.timestamp).label('time'),
-        func.count(Detection.id).label('detections')
-    ).filter(Detection.timestamp >= yesterday)\
-     .group_by('time')\
-     .order_by('time')\
-     .all()
+    timeline = (await db.execute(select(
+        EventRollup.bucket.label('time'),
+        func.sum(EventRollup.count).label('detections')
+    ).where(
+        EventRollup.kind == "detection",
+        EventRollup.granularity == "hour",
+        EventRollup.bucket >= yesterday.replace(minute=0, second=0, microsecond=0)
+    ).group_by(EventRollup.bucket)
+     .order_by(EventRollup.bucket)
+    )).all()
      
-    return [{"time": t.time.strftime("%H:%M"), "detections": t.detections} for t in timeline]
+    return [{"time": t.time.strftime("%H:%M"), "detections": int(t.detections)} for t in timeline]
 
 @router.get("/object-distribution")
-def get_object_distribution(
-    db: Session = Depends(get_db),
+async def get_object_distribution(
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(dependencies.get_current_active_user),
 ) -> Any:
-    dist = db.query(Detection.object_class, func.count(Detection.id).label('value'))\
-        .group_by(Detection.object_class)\
-        .order_by(desc('value'))\
-        .limit(5)\
-        .all()
+    dist = (await db.execute(
+        select(EventRollup.label.label('object_class'), func.sum(EventRollup.count).label('value'))
+        .where(EventRollup.kind == "detection", EventRollup.granularity == "day")
+        .group_by(EventRollup.label)
+        .order_by(desc('value'))
+        .limit(5)
+    )).all()
         
-    return [{"name": d.object_class.capitalize(), "value": d.value} for d in dist]
+    return [{"name": d.object_class.capitalize(), "value": int(d.value)} for d in dist]
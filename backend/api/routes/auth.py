@@ -2,30 +2,33 @@ from datetime import timedelta
 from typing import Any
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from core import security, dependencies
 from core.config import settings
-from core.database import get_db
+from core.database import get_async_db
 from models.user import User
 from schemas.user import Token, UserCreate, UserResponse
 
 router = APIRouter()
 
 @router.post("/login", response_model=Token)
-def login_access_token(
-    db: Session = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()
+async def login_access_token(
+    db: AsyncSession = Depends(get_async_db), form_data: OAuth2PasswordRequestForm = Depends()
 ) -> Any:
     """
     OAuth2 compatible token login, get an access token for future requests
     """
-    user = db.query(User).filter(User.email == form_data.username).first()
+    user = (await db.execute(select(User).where(User.email == form_data.username))).scalars().first()
     if not user:
         # Check if no users exist, maybe create first admin? But prompt says signup required.
         # Just fail.
         raise HTTPException(status_code=400, detail="Incorrect email or password")
     
-    if not security.verify_password(form_data.password, user.hashed_password):
+    # bcrypt is deliberately slow; keep it off the event loop
+    if not await run_in_threadpool(security.verify_password, form_data.password, user.hashed_password):
         raise HTTPException(status_code=400, detail="Incorrect email or password")
         
     if not user.is_active:
@@ -40,15 +43,15 @@ def login_access_token(
     }
 
 @router.post("/signup", response_model=UserResponse)
-def create_user(
+async def create_user(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user_in: UserCreate,
 ) -> Any:
     """
     Create new user.
     """
-    user = db.query(User).filter(User.email == user_in.email).first()
+    user = (await db.execute(select(User).where(User.email == user_in.email))).scalars().first()
     if user:
         raise HTTPException(
             status_code=400,
@@ -56,17 +59,17 @@ def create_user(
         )
     user = User(
         email=user_in.email,
-        hashed_password=security.get_password_hash(user_in.password),
+        hashed_password=await run_in_threadpool(security.get_password_hash, user_in.password),
         role=user_in.role,
         is_active=user_in.is_active,
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     return user
 
 @router.get("/me", response_model=UserResponse)
-def read_users_me(
+async def read_users_me(
     current_user: User = Depends(dependencies.get_current_user),
 ) -> Any:
     """
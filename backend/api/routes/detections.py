@@ -1,10 +1,10 @@
 from typing import List, Any
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy import select, desc
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from core import dependencies
-from core.database import get_db
+from core.database import get_async_db
 from models.detection import Detection
 from models.stream import Stream
 from schemas.detection import DetectionResponse
@@ -13,8 +13,8 @@ from models.user import User
 router = APIRouter()
 
 @router.get("/", response_model=List[DetectionResponse])
-def read_detections(
-    db: Session = Depends(get_db),
+async def read_detections(
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(dependencies.get_current_active_user),
     limit: int = 50,
     stream_id: str = None
@@ -23,12 +23,12 @@ def read_detections(
     Retrieve recent detections.
     If admin, see all. If user, see only their streams' detections.
     """
-    query = db.query(Detection).join(Stream)
+    query = select(Detection).join(Stream)
     
     if current_user.role != "admin":
-        query = query.filter(Stream.owner_id == current_user.id)
+        query = query.where(Stream.owner_id == current_user.id)
         
     if stream_id:
-        query = query.filter(Detection.stream_id == stream_id)
+        query = query.where(Detection.stream_id == stream_id)
     
-    return query.order_by(desc(Detection.timestamp)).limit(limit).all()
+    return (await db.execute(query.order_by(desc(Detection.timestamp)).limit(limit))).scalars().all()
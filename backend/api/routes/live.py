@@ -1,24 +1,35 @@
-from fastapi import APIRouter, Response
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
 from fastapi.responses import StreamingResponse
-import asyncio
-from services.video_processor import latest_frames
+from services.frame_bus import frame_bus
+from services.preview import preview_hub
 
 router = APIRouter()
 
-async def frame_generator(stream_id: str):
-    while True:
-        if stream_id in latest_frames:
-            frame = latest_frames[stream_id]
+async def frame_generator(stream_id: str, width: Optional[int] = None, fps: Optional[int] = None):
+    # Shared per-rendition encoder: each frame is encoded once for all viewers
+    key, channel = preview_hub.subscribe(stream_id, width, fps)
+    try:
+        async for jpeg in channel.frames():
             yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
-        else:
-            # Placeholder or wait
-            await asyncio.sleep(0.1)
-        await asyncio.sleep(0.04) # ~25 FPS
+                   b'Content-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n')
+    finally:
+        preview_hub.unsubscribe(key, channel)
 
 @router.get("/{stream_id}")
-async def get_live_stream(stream_id: str):
+async def get_live_stream(
+    stream_id: str,
+    width: Optional[int] = Query(None, gt=0),
+    fps: Optional[int] = Query(None, gt=0),
+):
+    """
+    MJPEG live view. Optional width / fps select a downscaled rendition
+    (e.g. ?width=320&fps=5 for grid tiles). 404 while the stream is not
+    being captured.
+    """
+    if not frame_bus.available(stream_id):
+        raise HTTPException(status_code=404, detail="Stream not running")
     return StreamingResponse(
-        frame_generator(stream_id),
+        frame_generator(stream_id, width, fps),
         media_type="multipart/x-mixed-replace; boundary=frame"
     )
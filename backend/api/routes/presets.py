@@ -1,43 +1,16 @@
 from fastapi import APIRouter, Body, Depends, HTTPException
 from typing import Any
+from uuid import UUID
+from sqlalchemy.ext.asyncio import AsyncSession
 from models.user import User
+from models.stream import Stream
 from core import dependencies
+from core.database import get_async_db
+from core.presets import INDUSTRY_PRESETS
+from services.control_channel import control_channel, stream_update_event
 
 router = APIRouter()
 
-INDUSTRY_PRESETS = {
-  "security": {
-    "label": "Security",
-    "watches": ["falling", "fighting", "loitering", "trespassing", "vandalism"],
-    "defaultZones": "full-frame",
-    "alertColor": "#e94560"
-  },
-  "retail": {
-    "label": "Retail",
-    "watches": ["concealing", "loitering", "running", "crowd-formation", "abandoned-bag"],
-    "defaultZones": "shelving-areas",
-    "alertColor": "#f59e0b"
-  },
-  "traffic": {
-    "label": "Traffic",
-    "watches": ["collision", "pedestrian-on-road", "vehicle-stopped", "speeding", "wrong-direction"],
-    "defaultZones": "road-lanes",
-    "alertColor": "#ef4444"
-  },
-  "healthcare": {
-    "label": "Healthcare",
-    "watches": ["falling", "lying-down", "restricted-zone-entry", "distress-gesture"],
-    "defaultZones": "room-boundary",
-    "alertColor": "#e94560"
-  },
-  "sports": {
-    "label": "Sports",
-    "watches": ["player-tracking", "out-of-bounds", "collision", "crowd-rush"],
-    "defaultZones": "field-boundary",
-    "alertColor": "#10b981"
-  }
-}
-
 @router.get("/")
 def get_presets(
     current_user: User = Depends(dependencies.get_current_active_user),
@@ -45,10 +18,21 @@ def get_presets(
     return INDUSTRY_PRESETS
 
 @router.post("/switch")
-def switch_preset(
+async def switch_preset(
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(dependencies.get_current_active_user),
-    stream_id: str = Body(...),
+    stream_id: UUID = Body(...),
     preset_name: str = Body(...)
 ) -> Any:
-    # Logic to update stream preset
+    if preset_name not in INDUSTRY_PRESETS:
+        raise HTTPException(status_code=400, detail="Unknown preset")
+    stream = await db.get(Stream, stream_id)
+    if not stream:
+        raise HTTPException(status_code=404, detail="Stream not found")
+    if stream.owner_id != current_user.id and current_user.role != "admin":
+        raise HTTPException(status_code=400, detail="Not enough permissions")
+    stream.config_preset = preset_name
+    await db.commit()
+    # A running processor switches its alert cooldowns without a restart
+    await control_channel.publish_async(stream_update_event(stream.id, {"config_preset": preset_name}), db)
     return {"status": "switched", "preset": preset_name}
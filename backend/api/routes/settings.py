@@ -1,39 +1,42 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Any, List
 
 from core import dependencies
-from core.database import get_db
+from core.database import get_async_db
 from models.setting import SystemSetting
 from schemas.setting import SettingUpdate, SettingResponse
 from models.user import User
+from services.control_channel import control_channel, settings_event
 
 router = APIRouter()
 
 @router.get("/", response_model=List[SettingResponse])
-def get_settings(
-    db: Session = Depends(get_db),
+async def get_settings(
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(dependencies.get_current_active_user),
 ) -> Any:
-    return db.query(SystemSetting).all()
+    return (await db.execute(select(SystemSetting))).scalars().all()
 
 @router.post("/", response_model=SettingResponse)
-def update_settings(
+async def update_settings(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     setting_in: SettingUpdate,
     current_user: User = Depends(dependencies.get_current_active_user),
 ) -> Any:
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not enough permissions")
         
-    db_setting = db.query(SystemSetting).filter(SystemSetting.category == setting_in.category).first()
+    db_setting = (await db.execute(select(SystemSetting).where(SystemSetting.category == setting_in.category))).scalars().first()
     if db_setting:
         db_setting.settings = setting_in.settings
     else:
         db_setting = SystemSetting(category=setting_in.category, settings=setting_in.settings)
         db.add(db_setting)
     
-    db.commit()
-    db.refresh(db_setting)
+    await db.commit()
+    await db.refresh(db_setting)
+    await control_channel.publish_async(settings_event(db_setting.category, db_setting.settings), db)
     return db_setting
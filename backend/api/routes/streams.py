@@ -1,19 +1,24 @@
 from typing import List, Any
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
 
 from core import dependencies
-from core.database import get_db
+from core.database import get_async_db
 from models.stream import Stream
 from schemas.stream import StreamCreate, StreamUpdate, StreamResponse
 from models.user import User
+from services.control_channel import control_channel, stream_event, stream_update_event
 
 router = APIRouter()
 
+# Stream fields a running processor picks up without a restart
+LIVE_FIELDS = ("detection_zones", "config_preset")
+
 @router.get("/", response_model=List[StreamResponse])
-def read_streams(
-    db: Session = Depends(get_db),
+async def read_streams(
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(dependencies.get_current_active_user),
     skip: int = 0,
     limit: int = 100,
@@ -21,14 +26,15 @@ def read_streams(
     """
     Retrieve streams.
     """
-    if current_user.role == "admin":
-        return db.query(Stream).offset(skip).limit(limit).all()
-    return db.query(Stream).filter(Stream.owner_id == current_user.id).offset(skip).limit(limit).all()
+    query = select(Stream)
+    if current_user.role != "admin":
+        query = query.where(Stream.owner_id == current_user.id)
+    return (await db.execute(query.offset(skip).limit(limit))).scalars().all()
 
 @router.post("/", response_model=StreamResponse)
-def create_stream(
+async def create_stream(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     stream_in: StreamCreate,
     current_user: User = Depends(dependencies.get_current_active_user),
 ) -> Any:
@@ -44,21 +50,21 @@ def create_stream(
         detection_zones=stream_in.detection_zones
     )
     db.add(stream)
-    db.commit()
-    db.refresh(stream)
+    await db.commit()
+    await db.refresh(stream)
     return stream
 
 @router.get("/{id}", response_model=StreamResponse)
-def read_stream(
+async def read_stream(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     id: UUID,
     current_user: User = Depends(dependencies.get_current_active_user),
 ) -> Any:
     """
     Get stream by ID.
     """
-    stream = db.query(Stream).filter(Stream.id == id).first()
+    stream = await db.get(Stream, id)
     if not stream:
         raise HTTPException(status_code=404, detail="Stream not found")
     if stream.owner_id != current_user.id and current_user.role != "admin":
@@ -66,9 +72,9 @@ def read_stream(
     return stream
 
 @router.patch("/{id}", response_model=StreamResponse)
-def update_stream(
+async def update_stream(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     id: UUID,
     stream_in: StreamUpdate,
     current_user: User = Depends(dependencies.get_current_active_user),
@@ -76,7 +82,7 @@ def update_stream(
     """
     Update a stream.
     """
-    stream = db.query(Stream).filter(Stream.id == id).first()
+    stream = await db.get(Stream, id)
     if not stream:
         raise HTTPException(status_code=404, detail="Stream not found")
     if stream.owner_id != current_user.id and current_user.role != "admin":
@@ -87,41 +93,47 @@ def update_stream(
         setattr(stream, field, value)
         
     db.add(stream)
-    db.commit()
-    db.refresh(stream)
+    await db.commit()
+    await db.refresh(stream)
+    if "status" in update_data:
+        await control_channel.publish_async(stream_event("start" if stream.status == "active" else "stop", stream.id), db)
+    changes = {field: getattr(stream, field) for field in LIVE_FIELDS if field in update_data}
+    if changes:
+        await control_channel.publish_async(stream_update_event(stream.id, changes), db)
     return stream
 
 @router.delete("/{id}", response_model=StreamResponse)
-def delete_stream(
+async def delete_stream(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     id: UUID,
     current_user: User = Depends(dependencies.get_current_active_user),
 ) -> Any:
     """
     Delete a stream.
     """
-    stream = db.query(Stream).filter(Stream.id == id).first()
+    stream = await db.get(Stream, id)
     if not stream:
         raise HTTPException(status_code=404, detail="Stream not found")
     if stream.owner_id != current_user.id and current_user.role != "admin":
         raise HTTPException(status_code=400, detail="Not enough permissions")
     
-    db.delete(stream)
-    db.commit()
+    await db.delete(stream)
+    await db.commit()
+    await control_channel.publish_async(stream_event("stop", id), db)
     return stream
 
 @router.post("/{id}/start")
-def start_stream(
+async def start_stream(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     id: UUID,
     current_user: User = Depends(dependencies.get_current_active_user),
 ) -> Any:
     """
     Start AI processing on stream.
     """
-    stream = db.query(Stream).filter(Stream.id == id).first()
+    stream = await db.get(Stream, id)
     if not stream:
         raise HTTPException(status_code=404, detail="Stream not found")
     
@@ -130,25 +142,27 @@ def start_stream(
     # start_stream_processing.delay(str(id)) 
     
     stream.status = "active"
-    db.commit()
+    await db.commit()
+    await control_channel.publish_async(stream_event("start", id), db)
     return {"status": "started"}
 
 @router.post("/{id}/stop")
-def stop_stream(
+async def stop_stream(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     id: UUID,
     current_user: User = Depends(dependencies.get_current_active_user),
 ) -> Any:
     """
     Stop AI processing on stream.
     """
-    stream = db.query(Stream).filter(Stream.id == id).first()
+    stream = await db.get(Stream, id)
     if not stream:
         raise HTTPException(status_code=404, detail="Stream not found")
     
     # Logic to stop stream
     
     stream.status = "inactive"
-    db.commit()
+    await db.commit()
+    await control_channel.publish_async(stream_event("stop", id), db)
     return {"status": "stopped"}
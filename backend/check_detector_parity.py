@@ -0,0 +1,88 @@
+"""
+Parity check between the PyTorch detector and an exported backend.
+Usage: python check_detector_parity.py [image_or_video ...] [--backend onnxruntime] [--int8]
+Runs both backends on the same frames and compares matched boxes; exits
+non-zero when the outputs diverge beyond tolerance.
+"""
+import sys
+import cv2
+from core.config import settings
+from services.yolo_detector import YoloDetector
+from services.model_registry import cached_path
+from services.tracker import iou_matrix
+
+BOX_IOU_MIN = 0.95
+CONF_TOLERANCE = 0.02 # INT8 weights drift more; see --int8
+CONF_TOLERANCE_INT8 = 0.1
+
+def load_frames(paths, per_video=10):
+    frames = []
+    for path in paths:
+        image = cv2.imread(path)
+        if image is not None:
+            frames.append(image)
+            continue
+        cap = cv2.VideoCapture(path)
+        while len(frames) < per_video:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            frames.append(frame)
+        cap.release()
+    return frames
+
+def compare(reference, candidate, conf_tolerance):
+    """
+    Returns: list of problems for one frame
+    """
+    problems = []
+    if len(reference) != len(candidate):
+        problems.append(f"count {len(reference)} vs {len(candidate)}")
+    if len(reference) == 0 or len(candidate) == 0:
+        return problems
+    iou = iou_matrix(reference.boxes, candidate.boxes)
+    same_class = reference.class_ids[:, None] == candidate.class_ids[None, :]
+    iou[~same_class] = 0.0
+    for i in range(len(reference)):
+        j = int(iou[i].argmax())
+        if iou[i, j] < BOX_IOU_MIN:
+            problems.append(f"{reference.class_names[i]} unmatched (best IoU {iou[i, j]:.3f})")
+        elif abs(reference.confidence[i] - candidate.confidence[j]) > conf_tolerance:
+            problems.append(f"{reference.class_names[i]} conf {reference.confidence[i]:.3f} vs {candidate.confidence[j]:.3f}")
+    return problems
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    backend = "onnxruntime"
+    if "--backend" in args:
+        i = args.index("--backend")
+        backend = args[i + 1]
+        del args[i:i + 2]
+    int8 = "--int8" in args
+    paths = [a for a in args if a != "--int8"]
+
+    frames = load_frames(paths) if paths else []
+    if not frames:
+        from ultralytics.utils import ASSETS
+        frames = load_frames([str(ASSETS / "bus.jpg"), str(ASSETS / "zidane.jpg")])
+
+    weights = cached_path(settings.DETECTOR_MODEL)
+    reference = YoloDetector(weights, backend="ultralytics")
+    candidate = YoloDetector(weights, backend=backend, int8=int8)
+    tolerance = CONF_TOLERANCE_INT8 if int8 else CONF_TOLERANCE
+
+    failures = 0
+    print("-" * 30)
+    for n, frame in enumerate(frames):
+        # Single frames and one batch, as the scheduler submits both
+        for label, ref, cand in (
+            ("single", reference.detect(frame), candidate.detect(frame)),
+            ("batch", reference.detect_batch([frame, frame])[1], candidate.detect_batch([frame, frame])[1]),
+        ):
+            problems = compare(ref, cand, tolerance)
+            status = "OK" if not problems else "MISMATCH"
+            print(f"[{n}:{label}] {status} ({len(ref)} boxes) {'; '.join(problems)}")
+            failures += bool(problems)
+    print("-" * 30)
+    print(f"{failures} mismatching result(s) across {len(frames)} frame(s), backend={backend}{' int8' if int8 else ''}")
+    sys.exit(1 if failures else 0)
@@ -1,12 +1,99 @@
-from sqlalchemy import create_engine
+import time
+import threading
+from collections import deque
+from sqlalchemy import create_engine, exc
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from .config import settings
 
 # In production/docker, we use the URL from settings
 SQLALCHEMY_DATABASE_URL = settings.SQLALCHEMY_DATABASE_URI
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+class PoolMetrics:
+    """
+    Connection checkout wait times for one engine. Waits include opening a new
+    connection when the pool grows; timeouts are checkouts that gave up after
+    DB_POOL_TIMEOUT because the pool was exhausted.
+    """
+    def __init__(self, history=1000):
+        self._waits = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.max_wait_ms = 0.0
+
+    def record(self, wait_ms: float, timed_out=False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self._waits.append(wait_ms)
+            self.checkouts += 1
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+
+    def stats(self, pool):
+        with self._lock:
+            waits = sorted(self._waits)
+        pick = lambda q: round(waits[min(len(waits) - 1, int(q * len(waits)))], 2) if waits else 0.0
+        return {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_p50_ms": pick(0.5),
+            "wait_p99_ms": pick(0.99),
+            "wait_max_ms": round(self.max_wait_ms, 2),
+        }
+
+class _TimedCheckout:
+    metrics = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record(0.0, timed_out=True)
+            raise
+        self.metrics.record((time.perf_counter() - start) * 1000)
+        return conn
+
+class WorkerQueuePool(_TimedCheckout, QueuePool):
+    metrics = PoolMetrics()
+
+class ApiQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    metrics = PoolMetrics()
+
+# Synchronous engine for stream workers, the detection writer, the
+# orchestrator and scripts; bounded separately from the API pool so stream
+# load cannot starve request handling
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    poolclass=WorkerQueuePool,
+    pool_size=settings.DB_WORKER_POOL_SIZE,
+    max_overflow=settings.DB_WORKER_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING
+)
+# Attributes stay loaded after commit: long-lived worker sessions would
+# otherwise re-open a transaction (and hold a pooled connection) on the next
+# attribute read
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+# asyncpg engine for the API routes
+async_engine = create_async_engine(
+    settings.SQLALCHEMY_ASYNC_DATABASE_URI,
+    poolclass=ApiQueuePool,
+    pool_size=settings.DB_API_POOL_SIZE,
+    max_overflow=settings.DB_API_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
 
@@ -16,3 +103,13 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def pool_stats():
+    return {
+        "api": ApiQueuePool.metrics.stats(async_engine.sync_engine.pool),
+        "worker": WorkerQueuePool.metrics.stats(engine.pool),
+    }
@@ -0,0 +1,41 @@
+"""
+Industry presets: what each deployment type watches for and its alert
+cooldowns. Shared by the presets API and the stream workers.
+"""
+INDUSTRY_PRESETS = {
+  "security": {
+    "label": "Security",
+    "watches": ["falling", "fighting", "loitering", "trespassing", "vandalism"],
+    "defaultZones": "full-frame",
+    "alertColor": "#e94560",
+    "alertCooldowns": {"default": 30, "Unauthorized Person": 30}
+  },
+  "retail": {
+    "label": "Retail",
+    "watches": ["concealing", "loitering", "running", "crowd-formation", "abandoned-bag"],
+    "defaultZones": "shelving-areas",
+    "alertColor": "#f59e0b",
+    "alertCooldowns": {"default": 60, "Unauthorized Person": 300}
+  },
+  "traffic": {
+    "label": "Traffic",
+    "watches": ["collision", "pedestrian-on-road", "vehicle-stopped", "speeding", "wrong-direction"],
+    "defaultZones": "road-lanes",
+    "alertColor": "#ef4444",
+    "alertCooldowns": {"default": 60, "Unauthorized Person": 120}
+  },
+  "healthcare": {
+    "label": "Healthcare",
+    "watches": ["falling", "lying-down", "restricted-zone-entry", "distress-gesture"],
+    "defaultZones": "room-boundary",
+    "alertColor": "#e94560",
+    "alertCooldowns": {"default": 15, "Unauthorized Person": 60}
+  },
+  "sports": {
+    "label": "Sports",
+    "watches": ["player-tracking", "out-of-bounds", "collision", "crowd-rush"],
+    "defaultZones": "field-boundary",
+    "alertColor": "#10b981",
+    "alertCooldowns": {"default": 120, "Unauthorized Person": 600}
+  }
+}
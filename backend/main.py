@@ -1,20 +1,41 @@
+import asyncio
+import os
 import threading
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.staticfiles import StaticFiles
 from core.config import settings
+from core.database import async_engine, pool_stats
 from api.api import api_router
 from api.websockets import live_feed
 from ai_worker import orchestrate
+from services.event_hub import event_hub, event_channel
+from services.model_registry import models
+from services.cpu_budget import cpu_budget
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup: Start the AI Orchestrator in a background thread
     print("[*] INITIALIZING NEURAL ORCHESTRATOR...")
-    orchestrator_thread = threading.Thread(target=orchestrate, daemon=True)
-    orchestrator_thread.start()
+    # Detection / alert events for WebSocket subscribers; events from worker
+    # processes arrive over the event channel
+    event_hub.attach(asyncio.get_running_loop())
+    if settings.CONTROL_CHANNEL == "postgres":
+        event_channel.subscribe(event_hub.publish)
+    if settings.ORCHESTRATOR_ENABLED:
+        orchestrator_thread = threading.Thread(target=orchestrate, daemon=True)
+        orchestrator_thread.start()
     yield
-    # Shutdown logic if needed
+    # Shutdown: flush detections still buffered in the write-behind queue
+    if settings.ORCHESTRATOR_ENABLED and settings.WORKER_MODE == "process":
+        from ai_worker import worker_pool
+        if worker_pool is not None:
+            worker_pool.shutdown()
+    elif settings.ORCHESTRATOR_ENABLED:
+        from services.video_processor import writer
+        writer.close()
+    await async_engine.dispose()
 
 app = FastAPI(
     title=settings.PROJECT_NAME, 
@@ -40,19 +61,17 @@ app.add_middleware(
 async def health_check():
     health_status = {
         "status": "ok",
-        "models_loaded": True, # Placeholder for AI models
+        "models": models.stats(), # loaded lazily by the stream processors
         "db_connected": False,
         "redis_connected": False
     }
     
     # Check Database
     try:
-        from core.database import SessionLocal
         from sqlalchemy import text
-        db = SessionLocal()
-        db.execute(text("SELECT 1"))
+        async with async_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
         health_status["db_connected"] = True
-        db.close()
     except Exception as e:
         print(f"DB Health check failed: {e}")
         health_status["status"] = "error"
@@ -66,12 +85,45 @@ async def health_check():
     except Exception as e:
         print(f"Redis Health check failed: {e}")
         # Not making status = error for redis as it might be optional for some ops
+
+    health_status["websockets"] = event_hub.stats()
+    # Checkout wait per pool; p99 growth means the pool is undersized
+    health_status["db_pools"] = pool_stats()
+    if not settings.ORCHESTRATOR_ENABLED:
+        pass # streams run in a separate ai_worker service
+    elif settings.WORKER_MODE == "process":
+        from ai_worker import worker_pool
+        health_status["workers"] = worker_pool.stats() if worker_pool else {}
+    else:
+        # Batched inference metrics (per-batch latency / fill ratio)
+        from services.frame_scheduler import detection_budget
+        from services.video_processor import writer, frame_schedulers, motion_gates, trackers, alert_suppressor, capture_readers, action_cascades
+        scheduler = models.peek("detection_scheduler")
+        health_status["inference"] = scheduler.stats() if scheduler else {}
+        health_status["detection_writer"] = writer.stats()
+        health_status["alert_suppression"] = alert_suppressor.stats()
+        health_status["cpu"] = cpu_budget.stats()
+        health_status["detection_budget"] = detection_budget.stats()
+        health_status["streams"] = {
+            sid: {
+                **s.stats(),
+                **(motion_gates[sid].stats() if sid in motion_gates else {}),
+                **(trackers[sid].stats() if sid in trackers else {}),
+                **(capture_readers[sid].stats() if sid in capture_readers else {}),
+                **(action_cascades[sid].stats() if sid in action_cascades else {}),
+            }
+            for sid, s in list(frame_schedulers.items())
+        }
         
     return health_status
 
 app.include_router(api_router, prefix=settings.API_V1_STR)
 app.include_router(live_feed.router)
 
+# Alert snapshots written by the stream processors
+os.makedirs(settings.SNAPSHOT_DIR, exist_ok=True)
+app.mount("/snapshots", StaticFiles(directory=settings.SNAPSHOT_DIR), name="snapshots")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -3,4 +3,4 @@ from .stream import Stream
 from .detection import Detection
 from .action import Action
 from .alert import Alert
-from .analytics import Analytics
+from .analytics import Analytics, EventRollup
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, String, Text, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 import uuid
@@ -17,4 +17,10 @@ class Alert(Base):
     resolved = Column(Boolean, default=False)
     resolved_by = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True)
     resolved_at = Column(DateTime, nullable=True)
-    created_at = Column(DateTime, server_default=func.now())
+    created_at = Column(DateTime, primary_key=True, server_default=func.now()) # partition key, part of PK
+
+    __table_args__ = (
+        Index('ix_alerts_stream_id_created_at', 'stream_id', 'created_at'),
+        Index('ix_alerts_created_at', 'created_at'),
+        {'postgresql_partition_by': 'RANGE (created_at)'},
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Date, JSON, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, Date, DateTime, String, Integer, JSON, ForeignKey, UniqueConstraint, Index
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
 from core.database import Base
@@ -17,3 +17,24 @@ class Analytics(Base):
     __table_args__ = (
         UniqueConstraint('stream_id', 'date', name='uix_stream_date'),
     )
+
+class EventRollup(Base):
+    """
+    Incrementally maintained counters per stream / label / time bucket.
+    kind: detection | alert | action, label: object class, alert type or action,
+    granularity: minute | hour | day (bucket is the truncated start time)
+    """
+    __tablename__ = "event_rollups"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    stream_id = Column(UUID(as_uuid=True), ForeignKey("streams.id", ondelete="CASCADE"), nullable=False)
+    kind = Column(String(20), nullable=False)
+    label = Column(String(100), nullable=False)
+    granularity = Column(String(10), nullable=False)
+    bucket = Column(DateTime, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint('granularity', 'bucket', 'stream_id', 'kind', 'label', name='uix_rollup_key'),
+        Index('ix_event_rollups_kind_granularity_bucket', 'kind', 'granularity', 'bucket'),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Float, Integer, JSON, DateTime, ForeignKey
+from sqlalchemy import Column, String, Float, Integer, JSON, DateTime, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
 from core.database import Base
@@ -8,8 +8,17 @@ class Detection(Base):
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     stream_id = Column(UUID(as_uuid=True), ForeignKey("streams.id", ondelete="CASCADE"))
-    timestamp = Column(DateTime, nullable=False)
+    timestamp = Column(DateTime, primary_key=True, nullable=False) # partition key, part of PK
     object_class = Column(String(100), nullable=False)
     confidence = Column(Float, nullable=False)
     bbox_json = Column(JSON, nullable=False)
     frame_number = Column(Integer, nullable=True)
+    track_id = Column(UUID(as_uuid=True), nullable=True) # set when written by the tracker
+    event = Column(String(10), nullable=True) # track lifecycle: start / update / end
+
+    __table_args__ = (
+        Index('ix_detections_stream_id_timestamp', 'stream_id', 'timestamp'),
+        Index('ix_detections_timestamp_object_class', 'timestamp', 'object_class'),
+        Index('ix_detections_track_id', 'track_id'),
+        {'postgresql_partition_by': 'RANGE (timestamp)'},
+    )
@@ -9,6 +9,8 @@ class DetectionBase(BaseModel):
     object_class: str
     confidence: float
     bbox_json: Optional[Dict[str, Any]] = None
+    track_id: Optional[UUID] = None
+    event: Optional[str] = None
 
 class DetectionCreate(DetectionBase):
     pass
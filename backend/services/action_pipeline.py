@@ -0,0 +1,124 @@
+"""
+Person-triggered action recognition.
+SlowFast only runs where the detector and tracker already found people:
+each confirmed person track (up to ACTION_MAX_TRACKS per stream, largest
+first) gets its own ClipBuffer cropped to the track's box, and once the clip
+is full a recognition is queued on the shared action scheduler at most every
+ACTION_INTERVAL seconds per track. Streams and periods without people cost
+nothing; SlowFast loads on a worker thread when the first person shows up.
+Results are persisted to `actions` by the stream loop, linked to the
+track's detection rows.
+"""
+import asyncio
+from collections import deque
+from services.cropping import expand_region
+from services.model_registry import models
+
+class TrackClip:
+    __slots__ = ("buffer", "times", "future", "last_run")
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.times = deque(maxlen=buffer.num_frames) # wall-clock time of stored frames
+        self.future = None
+        self.last_run = 0.0
+
+class ActionCascade:
+    def __init__(self, stream_id: str, names, max_tracks=2, interval=5.0, min_confidence=0.5,
+                 frame_stride=2, margin=0.1):
+        self.stream_id = stream_id
+        self.person_ids = {cid for cid, name in names.items() if name == "person"}
+        self.max_tracks = max_tracks
+        self.interval = interval
+        self.min_confidence = min_confidence
+        self.frame_stride = frame_stride
+        self.margin = margin
+        self.clips = {} # track id -> TrackClip
+        self._loading = None # executor future of the model load
+        self._load_failed = False
+
+        self.submitted = 0
+        self.recognized = 0
+
+    def _people(self, tracks, now):
+        # Tracks not matched for a whole interval (e.g. held through a
+        # motion-gated gap) would only feed empty crops to SlowFast
+        people = [t for t in tracks if t.confirmed and t.class_id in self.person_ids
+                  and now - t.last_seen <= self.interval]
+        people.sort(key=lambda t: float((t.box[2] - t.box[0]) * (t.box[3] - t.box[1])), reverse=True)
+        return people[:self.max_tracks]
+
+    def _models(self):
+        """
+        Returns: (recognizer, scheduler), or (None, None) while they load.
+        The first call starts the load in the default executor, like the
+        detection scheduler, so the event loop is not blocked by SlowFast.
+        """
+        recognizer, scheduler = models.peek("action_recognizer"), models.peek("action_scheduler")
+        if recognizer is not None and scheduler is not None:
+            return recognizer, scheduler
+        if self._loading is None:
+            # The scheduler factory loads the recognizer too
+            self._loading = asyncio.get_running_loop().run_in_executor(None, models.get, "action_scheduler")
+        elif self._loading.done() and not self._load_failed and self._loading.exception() is not None:
+            print(f"[!] Action recognizer failed to load on {self.stream_id}: {self._loading.exception()}")
+            self._load_failed = True
+        return None, None
+
+    def step(self, frame, tracks, now: float):
+        """
+        Feed one frame with the current tracks.
+        Returns: list of (track, result, duration_ms) recognitions ready to persist
+        """
+        people = self._people(tracks, now)
+        if not people and not self.clips:
+            return []
+
+        recognizer = scheduler = None
+        if people:
+            recognizer, scheduler = self._models()
+            if recognizer is None:
+                people = [] # still loading: only collect results already in flight
+
+        active = {t.id for t in people}
+        for track in people:
+            clip = self.clips.get(track.id)
+            if clip is None:
+                clip = self.clips[track.id] = TrackClip(recognizer.new_buffer(frame_stride=self.frame_stride))
+            if clip.future is not None:
+                continue # clip views are in use until the result arrives
+            # Crop follows the person
+            clip.buffer.region = expand_region(tuple(float(v) for v in track.box), self.margin)
+            if clip.buffer.push(frame):
+                clip.times.append(now)
+            if clip.buffer.ready() and now - clip.last_run >= self.interval:
+                clip.future = scheduler.submit(self.stream_id, clip.buffer.clip())
+                clip.last_run = now
+                self.submitted += 1
+
+        results = []
+        tracks_by_id = {t.id: t for t in tracks}
+        for track_id, clip in list(self.clips.items()):
+            if clip.future is not None and clip.future.done():
+                future, clip.future = clip.future, None
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"[!] Action recognition failed on {self.stream_id}: {e}")
+                    result = None
+                track = tracks_by_id.get(track_id)
+                if result is not None and track is not None and result["confidence"] >= self.min_confidence:
+                    duration_ms = int((clip.times[-1] - clip.times[0]) * 1000) if clip.times else None
+                    results.append((track, result, duration_ms))
+                    self.recognized += 1
+            # Forget people who left once nothing is in flight
+            if track_id not in active and clip.future is None:
+                del self.clips[track_id]
+        return results
+
+    def stats(self):
+        return {
+            "action_clips": len(self.clips),
+            "actions_submitted": self.submitted,
+            "actions_recognized": self.recognized,
+        }
@@ -1,109 +1,184 @@
+"""
+SlowFast action recognition.
+Frames are preprocessed once, when they enter a per-stream ClipBuffer
+(BGR->RGB, short-side scale + center crop, normalize), into a preallocated
+ring tensor. Every frame is written twice (at i and i + num_frames), so the
+newest num_frames frames are always one contiguous slice: the fast pathway
+is a view of the ring and the slow pathway a strided view of that, with no
+per-call copies or re-preprocessing. Clips from several streams are stacked
+into one forward pass by predict_batch(), which the shared InferenceScheduler
+drives (see make_action_scheduler).
+"""
+import json
+import os
 import torch
 import numpy as np
 import cv2
-from pytorchvideo.transforms import (
-    ApplyTransformToKey,
-    ShortSideScale,
-    UniformTemporalSubsample,
-    UniformCrop
-)
-from torchvision.transforms import Compose, Lambda
-from torchvision.transforms._transforms_video import (
-    CenterCropVideo,
-    NormalizeVideo,
-)
+from core.config import settings
+
+MEAN = 0.45
+STD = 0.225
+
+def load_class_names(path: str) -> dict:
+    """
+    Kinetics-400 names from pytorchvideo's kinetics_classnames.json
+    ({"name": id}); falls back to numbered labels when the file is absent.
+    """
+    if path and os.path.exists(path):
+        with open(path) as f:
+            raw = json.load(f)
+        return {int(v): str(k).replace('"', "") for k, v in raw.items()}
+    return {}
+
+class ClipBuffer:
+    """
+    Rolling, preprocessed clip for one stream.
+    push() costs one resize per frame; clip() returns views that stay valid
+    until the next push(), so callers await inference before pushing again.
+    """
+    def __init__(self, num_frames=32, alpha=4, size=256, frame_stride=1, region=None):
+        self.num_frames = num_frames
+        self.alpha = alpha
+        self.size = size
+        self.frame_stride = max(1, frame_stride)
+        self.region = region # optional normalized xyxy ROI, cropped before scaling
+        self.ring = torch.empty((3, 2 * num_frames, size, size), dtype=torch.float32)
+        self._rgb = np.empty((size, size, 3), dtype=np.uint8)
+        self.pushed = 0 # frames offered
+        self.count = 0 # frames stored
+
+    def _square_crop(self, frame):
+        """
+        Center square of the frame (or of the ROI): equal to ShortSideScale
+        followed by CenterCropVideo, but scaling only the kept pixels.
+        """
+        h, w = frame.shape[:2]
+        x1, y1, x2, y2 = 0, 0, w, h
+        if self.region is not None:
+            rx1, ry1, rx2, ry2 = self.region
+            x1, y1 = int(rx1 * w), int(ry1 * h)
+            x2, y2 = max(x1 + 1, int(rx2 * w)), max(y1 + 1, int(ry2 * h))
+        side = min(x2 - x1, y2 - y1)
+        cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
+        top, left = max(0, cy - side // 2), max(0, cx - side // 2)
+        return frame[top:top + side, left:left + side]
+
+    def push(self, frame) -> bool:
+        """
+        Add a BGR frame. Returns: True when it was stored (frame_stride)
+        """
+        self.pushed += 1
+        if (self.pushed - 1) % self.frame_stride:
+            return False
+        square = self._square_crop(frame)
+        cv2.resize(square, (self.size, self.size), dst=self._rgb, interpolation=cv2.INTER_LINEAR)
+        cv2.cvtColor(self._rgb, cv2.COLOR_BGR2RGB, dst=self._rgb)
+
+        # HWC uint8 -> CHW normalized float, written at both ring positions
+        chw = torch.from_numpy(self._rgb).permute(2, 0, 1)
+        idx = self.count % self.num_frames
+        target = self.ring[:, idx]
+        target.copy_(chw).div_(255.0).sub_(MEAN).div_(STD)
+        self.ring[:, idx + self.num_frames].copy_(target)
+        self.count += 1
+        return True
+
+    def ready(self) -> bool:
+        return self.count >= self.num_frames
+
+    def clip(self):
+        """
+        Returns: (slow, fast) views [C, T, H, W] of the newest num_frames frames
+        """
+        start = self.count % self.num_frames
+        fast = self.ring[:, start:start + self.num_frames]
+        slow = fast[:, ::self.alpha]
+        return slow, fast
+
+    def reset(self, region=None):
+        self.region = region
+        self.pushed = 0
+        self.count = 0
+
+def load_model(model_name: str, cache_dir: str):
+    """
+    Build the model from the installed pytorchvideo package and load its
+    weights from cache_dir, downloading them only on the first run (no
+    torch.hub repository fetch).
+    """
+    from pytorchvideo.models import hub
+    builder = getattr(hub, model_name)
+    path = os.path.join(cache_dir, f"{model_name}.pt")
+    if os.path.exists(path):
+        model = builder(pretrained=False)
+        model.load_state_dict(torch.load(path, map_location="cpu"))
+        return model
+    print(f"Downloading {model_name} weights to {path}...")
+    model = builder(pretrained=True)
+    os.makedirs(cache_dir, exist_ok=True)
+    torch.save(model.state_dict(), path)
+    return model
 
 class ActionRecognizer:
-    def __init__(self, model_name='slowfast_r50', device='cpu'):
+    def __init__(self, model_name='slowfast_r50', device='cpu', num_frames=32, alpha=4, size=256, cache_dir=None):
         # Use CPU by default for stability if GPU mem is tight with YOLO
         self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
         print(f"Loading SlowFast model on {self.device}...")
-        
-        # Load pre-trained model from torch hub
-        self.model = torch.hub.load('facebookresearch/pytorchvideo', model_name, pretrained=True)
+
+        self.model = load_model(model_name, cache_dir or settings.MODEL_CACHE_DIR)
         self.model = self.model.to(self.device)
         self.model.eval()
-        
-        # Standard SlowFast transforms
-        self.transforms = Compose([
-            ApplyTransformToKey(
-                key="video",
-                transform=Compose([
-                    UniformTemporalSubsample(8),
-                    Lambda(lambda x: x / 255.0),
-                    NormalizeVideo(
-                        mean=[0.45, 0.45, 0.45], 
-                        std=[0.225, 0.225, 0.225]
-                    ),
-                    ShortSideScale(
-                        size=256
-                    ),
-                    CenterCropVideo(256),
-                ]),
-            ),
-        ])
-        
-        # Kinetics-400 class names (simplified subset for demo)
-        # In a real app we would load the full json map
-        self.classes = {
-            # Map kinetics indices to our relevant classes if possible
-            # For now, we stub this or use a generic mapping
-            # This is a placeholder. Real implementation needs kinetics_classnames.json
-        }
-        
-    def preprocess(self, frames):
+
+        # slowfast_r50 (Kinetics-400): 32 fast frames, alpha 4 -> 8 slow frames, 256 px
+        self.num_frames = num_frames
+        self.alpha = alpha
+        self.size = size
+        self.classes = load_class_names(settings.ACTION_CLASSNAMES_PATH)
+
+    def new_buffer(self, frame_stride=1, region=None) -> ClipBuffer:
+        return ClipBuffer(self.num_frames, self.alpha, self.size, frame_stride, region)
+
+    def class_name(self, class_id: int) -> str:
+        return self.classes.get(class_id, f"kinetics_{class_id}")
+
+    def predict_batch(self, clips, imgsz=None):
         """
-        Input: list of 32 frames (numpy arrays BGR)
-        Output: list of inputs for SlowFast [slow_pathway, fast_pathway]
+        clips: list of (slow, fast) from ClipBuffer.clip(), any streams
+        imgsz: unused, accepted for InferenceScheduler compatibility
+        Returns: list of {"action", "class_id", "confidence"}, one per clip
         """
-        # Convert frames to tensor [T, H, W, C] -> [C, T, H, W]
-        # and convert BGR (OpenCV) to RGB
-        tensor_frames = [cv2.cvtColor(f, cv2.COLOR_BGR2RGB) for f in frames]
-        tensor = torch.from_numpy(np.stack(tensor_frames))
-        tensor = tensor.permute(3, 0, 1, 2) # C, T, H, W
-        tensor = tensor.float()
-        
-        # Apply transforms
-        input_data = self.transforms({"video": tensor})
-        video_data = input_data["video"]
-        
-        # Prepare pathways
-        # SlowFast requires a list: [slow_pathway, fast_pathway]
-        # param alpha=4 (fast pathway has 4x frames of slow)
-        fast_pathway = video_data
-        # Subsample for slow pathway (every 4th frame)
-        slow_pathway = torch.index_select(
-            video_data,
-            1,
-            torch.linspace(0, video_data.shape[1] - 1, video_data.shape[1] // 4).long(),
-        )
-        
-        inputs = [slow_pathway, fast_pathway]
-        # Move to device and add batch dim
-        return [i.to(self.device)[None, ...] for i in inputs]
+        if not clips:
+            return []
+        slow = torch.stack([s for s, _ in clips]).to(self.device)
+        fast = torch.stack([f for _, f in clips]).to(self.device)
+        with torch.inference_mode():
+            probs = torch.softmax(self.model([slow, fast]), dim=1)
+        confidence, class_ids = probs.max(dim=1)
+        return [
+            {"action": self.class_name(int(c)), "class_id": int(c), "confidence": float(p)}
+            for c, p in zip(class_ids.tolist(), confidence.tolist())
+        ]
 
     def predict(self, frame_buffer):
         """
-        Run inference on a buffer of frames
+        Run inference on a list of BGR frames (at least num_frames).
         """
-        if len(frame_buffer) < 32:
+        if len(frame_buffer) < self.num_frames:
             return None
-            
-        inputs = self.preprocess(frame_buffer)
-        
-        with torch.no_grad():
-            preds = self.model(inputs)
-        
-        # Get top prediction
-        post_act = torch.nn.Softmax(dim=1)
-        preds = post_act(preds)
-        pred_classes = preds.topk(k=1)
-        
-        # Map to class name (stub)
-        # pred_class_id = pred_classes.indices[0]
-        # confidence = pred_classes.values[0]
-        
-        return {
-            "action": "unknown", # placeholder
-            "confidence": 0.0
-        }
+        buffer = self.new_buffer()
+        for frame in frame_buffer[-self.num_frames:]:
+            buffer.push(frame)
+        return self.predict_batch([buffer.clip()])[0]
+
+def make_action_scheduler(recognizer: ActionRecognizer):
+    """
+    Cross-stream batching for clips, on the same scheduler as detection.
+    """
+    from services.inference_scheduler import InferenceScheduler
+    return InferenceScheduler(
+        recognizer,
+        max_batch_size=settings.ACTION_MAX_BATCH_SIZE,
+        max_wait_ms=settings.ACTION_MAX_WAIT_MS,
+        batch_fn=recognizer.predict_batch,
+        name="action_recognizer"
+    )
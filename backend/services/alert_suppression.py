@@ -0,0 +1,149 @@
+"""
+Alert deduplication for the stream hot loops.
+Whether an alert may fire is decided from a cache keyed by
+(stream_id, alert_type) instead of querying the alerts table per detection:
+an alert fires only when no alert of that type was raised on the stream
+within its cooldown window.
+
+Backends (settings.ALERT_SUPPRESSION_BACKEND):
+    local - in-process dict, entries evicted after ALERT_SUPPRESSION_TTL
+    redis - SET NX PX on REDIS_URL, shared by every worker process so a
+            stream moved to another worker keeps its cooldown
+Cooldowns come from the stream's preset ("alertCooldowns" in
+INDUSTRY_PRESETS), falling back to ALERT_COOLDOWN_SECONDS.
+"""
+import abc
+import threading
+import time
+from core.config import settings
+from core.presets import INDUSTRY_PRESETS
+
+def preset_cooldowns(preset: str) -> dict:
+    """
+    Returns: {alert_type: cooldown_seconds} for a preset, may contain "default"
+    """
+    return INDUSTRY_PRESETS.get(preset or "", {}).get("alertCooldowns", {})
+
+class AlertSuppressor(abc.ABC):
+    def __init__(self, default_cooldown=30.0, ttl=3600.0):
+        self.default_cooldown = default_cooldown
+        self.ttl = ttl
+        self.rules = {} # stream_id -> {alert_type: cooldown}
+
+        self.fired = 0
+        self.suppressed = 0
+
+    def configure(self, stream_id: str, preset: str):
+        self.rules[stream_id] = preset_cooldowns(preset)
+
+    def release(self, stream_id: str):
+        self.rules.pop(stream_id, None)
+
+    def cooldown(self, stream_id: str, alert_type: str) -> float:
+        rules = self.rules.get(stream_id, {})
+        return float(rules.get(alert_type, rules.get("default", self.default_cooldown)))
+
+    def should_fire(self, stream_id: str, alert_type: str, now=None) -> bool:
+        """
+        Atomically check the cooldown and, when the alert may fire, start a
+        new window. The caller then writes the alert.
+        """
+        now = now if now is not None else time.time()
+        if self._acquire(stream_id, alert_type, now, self.cooldown(stream_id, alert_type)):
+            self.fired += 1
+            return True
+        self.suppressed += 1
+        return False
+
+    @abc.abstractmethod
+    def prime(self, stream_id: str, alert_type: str, fired_at: float):
+        """
+        Seed the window from the last persisted alert (stream startup).
+        """
+
+    @abc.abstractmethod
+    def _acquire(self, stream_id, alert_type, now, cooldown) -> bool:
+        ...
+
+    def stats(self):
+        total = self.fired + self.suppressed
+        return {
+            "alerts_fired": self.fired,
+            "alerts_suppressed": self.suppressed,
+            "suppression_ratio": round(self.suppressed / total, 3) if total else 0.0,
+        }
+
+class LocalAlertSuppressor(AlertSuppressor):
+    def __init__(self, default_cooldown=30.0, ttl=3600.0, sweep_interval=60.0):
+        super().__init__(default_cooldown, ttl)
+        self.sweep_interval = sweep_interval
+        self._last_fired = {} # (stream_id, alert_type) -> wall-clock seconds
+        self._lock = threading.Lock()
+        self._last_sweep = time.time()
+
+    def prime(self, stream_id, alert_type, fired_at):
+        with self._lock:
+            key = (stream_id, alert_type)
+            self._last_fired[key] = max(self._last_fired.get(key, 0.0), fired_at)
+
+    def _acquire(self, stream_id, alert_type, now, cooldown):
+        key = (stream_id, alert_type)
+        with self._lock:
+            if now - self._last_sweep >= self.sweep_interval:
+                self._sweep(now)
+            last = self._last_fired.get(key)
+            if last is not None and now - last < cooldown:
+                return False
+            self._last_fired[key] = now
+            return True
+
+    def _sweep(self, now):
+        # TTL eviction; an entry older than every cooldown no longer suppresses anything
+        horizon = max(self.ttl, self.default_cooldown)
+        self._last_fired = {k: t for k, t in self._last_fired.items() if now - t < horizon}
+        self._last_sweep = now
+
+    def stats(self):
+        return {**super().stats(), "suppression_keys": len(self._last_fired)}
+
+class RedisAlertSuppressor(AlertSuppressor):
+    def __init__(self, url: str, default_cooldown=30.0, ttl=3600.0, prefix="sentinel:alert"):
+        super().__init__(default_cooldown, ttl)
+        import redis
+        self.redis = redis.from_url(url, socket_timeout=0.5)
+        self.prefix = prefix
+        # Used while Redis is unreachable so alerts are still deduplicated per process
+        self.fallback = LocalAlertSuppressor(default_cooldown, ttl)
+
+    def _key(self, stream_id, alert_type):
+        return f"{self.prefix}:{stream_id}:{alert_type}"
+
+    def prime(self, stream_id, alert_type, fired_at):
+        remaining = self.cooldown(stream_id, alert_type) - (time.time() - fired_at)
+        self.fallback.prime(stream_id, alert_type, fired_at)
+        if remaining <= 0:
+            return
+        try:
+            self.redis.set(self._key(stream_id, alert_type), fired_at, nx=True, px=int(remaining * 1000))
+        except Exception as e:
+            print(f"[!] Alert suppression cache unavailable: {e}")
+
+    def _acquire(self, stream_id, alert_type, now, cooldown):
+        try:
+            # The key expires with the window, so Redis does the TTL eviction
+            return bool(self.redis.set(self._key(stream_id, alert_type), now, nx=True, px=max(1, int(cooldown * 1000))))
+        except Exception as e:
+            print(f"[!] Alert suppression cache unavailable, deciding locally: {e}")
+            return self.fallback._acquire(stream_id, alert_type, now, cooldown)
+
+def create_suppressor(backend: str) -> AlertSuppressor:
+    if backend == "redis":
+        return RedisAlertSuppressor(
+            settings.REDIS_URL,
+            default_cooldown=settings.ALERT_COOLDOWN_SECONDS,
+            ttl=settings.ALERT_SUPPRESSION_TTL
+        )
+    return LocalAlertSuppressor(
+        default_cooldown=settings.ALERT_COOLDOWN_SECONDS,
+        ttl=settings.ALERT_SUPPRESSION_TTL
+    )
@@ -0,0 +1,94 @@
+"""
+Reusable frame buffers for the capture-to-inference path.
+A FramePool hands out preallocated NumPy arrays of one shape; decoders read
+straight into them (cap.read(image=buf), cv2.resize(dst=buf)) so the steady
+state loop does no large allocations. Buffers are reference counted: the
+capture thread, the stream loop and anything else holding a frame retain()
+and release() it, and the array returns to the pool when the count drops to
+zero. A pool that runs dry allocates a temporary array (counted as a miss)
+rather than blocking the decoder.
+"""
+import threading
+from collections import deque
+import numpy as np
+
+class FrameBuffer:
+    __slots__ = ("array", "pool", "refs", "parent")
+
+    def __init__(self, array, pool=None):
+        self.array = array
+        self.pool = pool
+        self.refs = 1
+        self.parent = None # native frame a scaled buffer was derived from (FrameBuffer or decoder frame)
+
+    def retain(self):
+        with FramePool.lock:
+            self.refs += 1
+        return self
+
+    def release(self):
+        with FramePool.lock:
+            self.refs -= 1
+            free = self.refs == 0
+        if not free:
+            return
+        parent, self.parent = self.parent, None
+        if self.pool is not None:
+            self.pool._put(self)
+        if isinstance(parent, FrameBuffer):
+            parent.release()
+
+class FramePool:
+    # One lock for all refcounts; contention is a handful of ops per frame
+    lock = threading.Lock()
+
+    def __init__(self, shape, dtype=np.uint8, size=4):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.size = size
+        self._free = deque(np.empty(self.shape, dtype=self.dtype) for _ in range(size))
+
+        self.hits = 0
+        self.misses = 0
+
+    def acquire(self) -> FrameBuffer:
+        with FramePool.lock:
+            array = self._free.popleft() if self._free else None
+        if array is None:
+            self.misses += 1
+            return FrameBuffer(np.empty(self.shape, dtype=self.dtype))
+        self.hits += 1
+        return FrameBuffer(array, self)
+
+    def _put(self, buffer: FrameBuffer):
+        with FramePool.lock:
+            if len(self._free) < self.size:
+                self._free.append(buffer.array)
+        buffer.pool = None
+
+class PoolSet:
+    """
+    Pools keyed by shape, so a source that changes resolution (reconnect to a
+    different profile) gets fresh buffers and old ones are simply dropped.
+    """
+    def __init__(self, size=4):
+        self.size = size
+        self.pools = {}
+
+    def acquire(self, shape) -> FrameBuffer:
+        shape = tuple(shape)
+        pool = self.pools.get(shape)
+        if pool is None:
+            # Keep only the pools for the current native / scaled shapes
+            if len(self.pools) >= 2:
+                self.pools.clear()
+            pool = self.pools[shape] = FramePool(shape, size=self.size)
+        return pool.acquire()
+
+    def stats(self):
+        hits = sum(p.hits for p in self.pools.values())
+        misses = sum(p.misses for p in self.pools.values())
+        return {
+            "buffer_pools": len(self.pools),
+            "buffer_hit_ratio": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+        }
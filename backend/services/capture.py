@@ -0,0 +1,353 @@
+"""
+Pluggable video capture for the stream processors.
+A FrameReader owns one decoder per stream on a dedicated thread. For live
+sources (cameras, RTSP/HTTP) it keeps only the newest decoded frame, so a
+slow consumer skips frames instead of falling further behind live; files
+are handed over frame by frame. Live sources reconnect with exponential
+backoff when the connection drops.
+
+Frames are decoded into pooled, reference-counted buffers (services/
+buffer_pool.py) and handed to the consumer as FrameBuffer objects.
+
+With keep_full=True frames are delivered at max_width (the inference
+resolution) while the full-resolution image stays available through
+full_frame() for alert snapshots: OpenCV keeps the decoded frame, PyAV keeps
+the decoder's YUV frame and only converts it when a snapshot is taken.
+
+Decoders (settings.CAPTURE_BACKEND):
+    opencv - cv2.VideoCapture with Linux backends (V4L2 / FFmpeg)
+    pyav   - FFmpeg through PyAV, supports keyframe-only decode and
+             scaling inside the decoder
+"""
+import asyncio
+import sys
+import threading
+import time
+import cv2
+import numpy as np
+from services.buffer_pool import FrameBuffer, PoolSet
+
+LIVE_SCHEMES = ("rtsp://", "rtsps://", "rtmp://", "http://", "https://", "udp://", "tcp://")
+
+def parse_source(url: str):
+    """
+    Returns: (source, is_live) where a numeric url is a device index
+    """
+    if url.isdigit():
+        return int(url), True
+    return url, url.lower().startswith(LIVE_SCHEMES)
+
+def scaled_size(width: int, height: int, max_width: int):
+    if not max_width or width <= max_width:
+        return width, height
+    return max_width, max(2, int(round(height * max_width / width / 2)) * 2)
+
+class OpenCVSource:
+    def __init__(self, source, max_width=0, keep_full=False):
+        self.source = source
+        self.max_width = max_width
+        self.keep_full = keep_full
+        self.native_size = None
+        self.cap = None
+
+    def _backends(self):
+        if sys.platform.startswith("win"):
+            return [cv2.CAP_DSHOW, cv2.CAP_MSMF, cv2.CAP_ANY]
+        if isinstance(self.source, int):
+            return [cv2.CAP_V4L2, cv2.CAP_ANY]
+        return [cv2.CAP_FFMPEG, cv2.CAP_ANY]
+
+    def open(self) -> bool:
+        for backend in self._backends():
+            cap = cv2.VideoCapture(self.source, backend)
+            if cap.isOpened():
+                # Do not let the driver queue frames behind live
+                cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+                self.cap = cap
+                return True
+            cap.release()
+        return False
+
+    def read(self, pools: PoolSet):
+        """
+        Decode into pooled buffers.
+        Returns: FrameBuffer or None; when the frame was scaled and keep_full
+        is set, its parent is the native-resolution buffer
+        """
+        native = pools.acquire((self.native_size[1], self.native_size[0], 3)) if self.native_size else None
+        ok, frame = self.cap.read(image=native.array) if native is not None else self.cap.read()
+        if not ok:
+            if native is not None:
+                native.release()
+            return None
+        if native is None or frame is not native.array:
+            # First frame or the source changed resolution: the pool catches up next read
+            if native is not None:
+                native.release()
+            native = FrameBuffer(frame)
+        h, w = frame.shape[:2]
+        self.native_size = (w, h)
+        width, height = scaled_size(w, h, self.max_width)
+        if (width, height) == (w, h):
+            return native
+        scaled = pools.acquire((height, width, 3))
+        cv2.resize(frame, (width, height), dst=scaled.array, interpolation=cv2.INTER_AREA)
+        if self.keep_full:
+            scaled.parent = native
+        else:
+            native.release()
+        return scaled
+
+    @staticmethod
+    def materialize(full):
+        return full.array
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+class PyAVSource:
+    def __init__(self, source, max_width=0, keyframes_only=False, keep_full=False):
+        self.source = source
+        self.max_width = max_width
+        self.keyframes_only = keyframes_only
+        self.keep_full = keep_full
+        self.native_size = None
+        self.container = None
+        self.frames = None
+
+    def open(self) -> bool:
+        import av
+        options = {"rtsp_transport": "tcp", "fflags": "nobuffer", "flags": "low_delay"}
+        if isinstance(self.source, int):
+            self.container = av.open(f"/dev/video{self.source}", format="v4l2")
+        else:
+            self.container = av.open(self.source, options=options, timeout=10)
+        stream = self.container.streams.video[0]
+        stream.thread_type = "AUTO"
+        if self.keyframes_only:
+            # Skip inter frames inside the decoder: only I-frames are produced
+            stream.codec_context.skip_frame = "NONKEY"
+        self.frames = self.container.decode(stream)
+        return True
+
+    def read(self, pools: PoolSet):
+        try:
+            frame = next(self.frames)
+        except StopIteration:
+            return None
+        self.native_size = (frame.width, frame.height)
+        width, height = scaled_size(frame.width, frame.height, self.max_width)
+        # Scaling and colour conversion in one swscale pass (libav buffer pool),
+        # then into a pooled array
+        converted = frame.reformat(width=width, height=height, format="bgr24")
+        buffer = pools.acquire((height, width, 3))
+        np.copyto(buffer.array, converted.to_ndarray())
+        if self.keep_full and (width, height) != (frame.width, frame.height):
+            buffer.parent = frame # decoder frame, converted only for snapshots
+        return buffer
+
+    @staticmethod
+    def materialize(full):
+        return full.to_ndarray(format="bgr24")
+
+    def release(self):
+        if self.container is not None:
+            self.container.close()
+            self.container = None
+
+def create_source(source, backend="opencv", max_width=0, decode_mode="all", keep_full=False):
+    if backend == "pyav":
+        return PyAVSource(source, max_width, keyframes_only=decode_mode == "keyframes", keep_full=keep_full)
+    return OpenCVSource(source, max_width, keep_full=keep_full)
+
+class FrameReader:
+    def __init__(self, url: str, backend="opencv", max_width=0, decode_mode="all",
+                 max_backoff=30.0, reconnect_timeout=120.0, keep_full=False, pool_size=4):
+        self.source, self.live = parse_source(url)
+        self.backend = backend
+        self.max_width = max_width
+        self.decode_mode = decode_mode
+        self.keep_full = keep_full
+        self.max_backoff = max_backoff
+        self.reconnect_timeout = reconnect_timeout
+
+        # Newest-frame handoff needs: one decoding, one pending, one held by the loop
+        self.pools = PoolSet(size=pool_size)
+        self._cond = threading.Condition()
+        self._frame = None # pending FrameBuffer, owned by the reader until taken
+        self._materialize = None
+        self.source_size = None # native (width, height)
+        self._seq = 0
+        self._taken = 0
+        self._closed = False
+        self.failed = False
+        self.opened = False
+
+        self._loop = None
+        self._ready = None
+
+        self.decoded = 0
+        self.dropped = 0
+        self.reconnects = 0
+
+        self._thread = threading.Thread(target=self._run, name="capture-reader", daemon=True)
+
+    def start(self, loop=None):
+        """
+        Start decoding; with a loop, read_async() is woken without an executor.
+        """
+        if loop is not None:
+            self._loop = loop
+            self._ready = asyncio.Event()
+        self._thread.start()
+        return self
+
+    def _open(self):
+        source = create_source(self.source, self.backend, self.max_width, self.decode_mode, self.keep_full)
+        try:
+            if source.open():
+                return source
+        except Exception as e:
+            print(f"[!] Capture open failed ({self.backend}): {e}")
+        source.release()
+        return None
+
+    def _connect(self):
+        """
+        Open the source, retrying live sources with exponential backoff.
+        """
+        backoff = 1.0
+        deadline = time.monotonic() + self.reconnect_timeout
+        while not self._closed:
+            source = self._open()
+            if source is not None:
+                return source
+            if not self.live or time.monotonic() + backoff > deadline:
+                return None
+            print(f"[!] Capture unavailable, retrying in {backoff:.0f}s")
+            time.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+        return None
+
+    def _run(self):
+        source = self._connect()
+        while source is not None and not self._closed:
+            self.opened = True
+            try:
+                buffer = source.read(self.pools)
+            except Exception as e:
+                print(f"[!] Capture read failed: {e}")
+                buffer = None
+            if buffer is None:
+                source.release()
+                if not self.live:
+                    break
+                self.reconnects += 1
+                source = self._connect()
+                continue
+            self._materialize = source.materialize
+            self.source_size = source.native_size
+            self._publish(buffer)
+        if source is not None:
+            source.release()
+        with self._cond:
+            self.failed = not self._closed
+            self._closed = True
+            self._cond.notify_all()
+        self._wake()
+
+    def _publish(self, buffer):
+        with self._cond:
+            if not self.live:
+                # Files: hand over every frame, decoding paces to the consumer
+                while self._seq > self._taken and not self._closed:
+                    self._cond.wait(0.5)
+            if self._closed:
+                buffer.release()
+                return
+            if self._frame is not None:
+                # Stale frame never reached the consumer: straight back to the pool
+                self._frame.release()
+                self.dropped += 1
+            self._frame = buffer
+            self._seq += 1
+            self.decoded += 1
+            self._cond.notify_all()
+        self._wake()
+
+    def _wake(self):
+        if self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._ready.set)
+            except RuntimeError:
+                pass # loop already closed
+
+    def _take(self):
+        with self._cond:
+            if self._seq > self._taken:
+                self._taken = self._seq
+                buffer, self._frame = self._frame, None
+                self._cond.notify_all()
+                return buffer
+            return None
+
+    def full_frame(self, buffer):
+        """
+        Native-resolution BGR image of a delivered frame; only converted when
+        asked for (alert snapshots).
+        """
+        if buffer.parent is None:
+            return buffer.array
+        return self._materialize(buffer.parent)
+
+    def read(self, timeout=None):
+        """
+        Blocking read of the newest undelivered frame, None on failure/timeout.
+        Returns a FrameBuffer owned by the caller, who must release() it.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._cond:
+            while self._seq == self._taken and not self._closed:
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+        return self._take()
+
+    async def read_async(self, timeout=None):
+        """
+        Await the newest undelivered frame, None on failure/timeout.
+        Returns a FrameBuffer owned by the caller, who must release() it.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            self._ready.clear()
+            frame = self._take()
+            if frame is not None or self._closed:
+                return frame
+            remaining = deadline - time.monotonic() if deadline is not None else None
+            if remaining is not None and remaining <= 0:
+                return None
+            try:
+                await asyncio.wait_for(self._ready.wait(), remaining)
+            except asyncio.TimeoutError:
+                return None
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            if self._frame is not None:
+                self._frame.release()
+                self._frame = None
+            self._cond.notify_all()
+
+    def stats(self):
+        return {
+            "capture_backend": self.backend,
+            "frames_decoded": self.decoded,
+            "frames_dropped": self.dropped,
+            "reconnects": self.reconnects,
+            **self.pools.stats(),
+        }
@@ -0,0 +1,178 @@
+"""
+Control channel for stream start/stop and settings changes.
+API routes publish events; orchestrators and stream workers subscribe and
+react immediately instead of polling the streams / system_settings tables.
+
+Backends (settings.CONTROL_CHANNEL):
+    postgres - LISTEN/NOTIFY, works across processes (required for WORKER_MODE=process)
+    local    - in-process dispatch, for single-process deployments
+Both expose the same publish/subscribe interface.
+"""
+import abc
+import json
+import select
+import threading
+import time
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from core.config import settings
+
+CHANNEL = "sentinel_control"
+
+class ControlChannel(abc.ABC):
+    def __init__(self):
+        self._subscribers = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback):
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def _dispatch(self, event: dict):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"[!] Control subscriber failed on {event.get('type')}: {e}")
+
+    @abc.abstractmethod
+    def publish(self, event: dict, db=None):
+        ...
+
+    async def publish_async(self, event: dict, db):
+        """
+        publish() from async API routes, on their AsyncSession.
+        """
+        self._dispatch(event)
+
+class LocalControlChannel(ControlChannel):
+    def publish(self, event: dict, db=None):
+        self._dispatch(event)
+
+class PostgresControlChannel(ControlChannel):
+    def __init__(self, dsn: str, channel: str = CHANNEL):
+        super().__init__()
+        self.dsn = dsn
+        self.channel = channel
+        self._listener = None
+
+    def subscribe(self, callback):
+        super().subscribe(callback)
+        # Only processes that consume events hold a LISTEN connection
+        if self._listener is None:
+            self._listener = threading.Thread(target=self._listen, name="control-listener", daemon=True)
+            self._listener.start()
+
+    def publish(self, event: dict, db=None):
+        payload = json.dumps(event, default=str)
+        if db is not None:
+            db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": self.channel, "payload": payload})
+            db.commit()
+            return
+        from core.database import SessionLocal
+        session = SessionLocal()
+        try:
+            self.publish(event, session)
+        finally:
+            session.close()
+
+    async def publish_async(self, event: dict, db):
+        payload = json.dumps(event, default=str)
+        await db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": self.channel, "payload": payload})
+        await db.commit()
+
+    def _listen(self):
+        import psycopg2
+        from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+        backoff = 1
+        first = True
+        while True:
+            conn = None
+            try:
+                conn = psycopg2.connect(self.dsn)
+                conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+                conn.cursor().execute(f"LISTEN {self.channel}")
+                backoff = 1
+                if not first:
+                    # Events may have been missed while disconnected
+                    self._dispatch({"type": "resync"})
+                first = False
+                while True:
+                    if select.select([conn], [], [], 5) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        try:
+                            self._dispatch(json.loads(notify.payload))
+                        except ValueError:
+                            print(f"[!] Malformed control event: {notify.payload}")
+            except Exception as e:
+                print(f"[!] Control listener error: {e}; reconnecting in {backoff}s")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+class ControlState:
+    """
+    Process-local view of control events, read by the stream hot loops
+    without touching the database.
+    """
+    def __init__(self, channel: ControlChannel):
+        self.stopped = set()
+        self.settings = {} # category -> settings dict
+        self.stream_updates = {} # stream_id -> {field: value} not yet picked up
+        channel.subscribe(self._on_event)
+
+    def _on_event(self, event: dict):
+        if event.get("type") == "stream":
+            if event.get("action") == "stop":
+                self.stopped.add(event["stream_id"])
+            elif event.get("action") == "start":
+                self.stopped.discard(event["stream_id"])
+            elif event.get("action") == "update":
+                self.stream_updates.setdefault(event["stream_id"], {}).update(event.get("changes", {}))
+        elif event.get("type") == "settings":
+            self.settings[event["category"]] = event["settings"]
+
+    def stop(self, stream_id: str):
+        """
+        Local stop, e.g. when a reconcile finds a stream no longer active.
+        """
+        self.stopped.add(stream_id)
+
+    def should_stop(self, stream_id: str) -> bool:
+        return stream_id in self.stopped
+
+    def take_updates(self, stream_id: str) -> dict:
+        """
+        Returns: {field: value} of stream settings changed since the last
+        call (e.g. detection_zones, config_preset); each update is returned once
+        """
+        return self.stream_updates.pop(stream_id, None) or {}
+
+    def get(self, category: str, key: str, default=None):
+        return self.settings.get(category, {}).get(key, default)
+
+def create_channel(backend: str, channel: str = CHANNEL) -> ControlChannel:
+    if backend == "local":
+        return LocalControlChannel()
+    # psycopg2 wants a libpq DSN, not a SQLAlchemy URL with a driver suffix
+    dsn = make_url(settings.SQLALCHEMY_DATABASE_URI).set(drivername="postgresql").render_as_string(hide_password=False)
+    return PostgresControlChannel(dsn, channel)
+
+control_channel = create_channel(settings.CONTROL_CHANNEL)
+
+def stream_event(action: str, stream_id) -> dict:
+    return {"type": "stream", "action": action, "stream_id": str(stream_id)}
+
+def stream_update_event(stream_id, changes: dict) -> dict:
+    return {"type": "stream", "action": "update", "stream_id": str(stream_id), "changes": changes}
+
+def settings_event(category: str, values: dict) -> dict:
+    return {"type": "settings", "category": category, "settings": values}
@@ -0,0 +1,166 @@
+"""
+CPU budgets for inference.
+Stream processors share one batching scheduler per model (see
+services/inference_scheduler.py), but every process that loads torch, ONNX
+Runtime or OpenCV still sizes its thread pools to the whole machine. With
+several worker processes, or the detector and SlowFast running side by side,
+that oversubscribes the cores and throughput drops as streams are added.
+
+One CpuBudget per process divides the cores:
+- CPU_RESERVED_CORES stay free for the API and orchestrator
+- the rest is split evenly across worker processes (pinned with
+  sched_setaffinity when CPU_AFFINITY is set)
+- inside a process, capture/decoding keeps CPU_DECODE_CORES_PER_STREAM per
+  running stream and the remainder is divided between the loaded models
+
+Only ONNX Runtime sessions get a per-model thread count (fixed when the
+session is created). torch.set_num_threads is process-global, so every torch
+model in a process shares one pool sized to the sum of the model budgets.
+Budgets are applied before torch is imported (OMP/MKL env) and re-applied
+by the schedulers whenever the stream count changes the allocation.
+"""
+import math
+import os
+import sys
+import threading
+from core.config import settings
+
+# Share of the per-process inference threads when SlowFast runs next to the detector
+MODEL_WEIGHTS = {"detector": 2, "action_recognizer": 1}
+
+def machine_cores() -> list:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+class CpuBudget:
+    def __init__(self, reserved=1, workers=1, decode_per_stream=0.25, inference_threads=0,
+                 opencv_threads=1, affinity=False):
+        self.reserved = max(0, reserved)
+        self.workers = max(1, workers)
+        self.decode_per_stream = decode_per_stream
+        self.inference_threads = inference_threads
+        self.opencv_threads = opencv_threads
+        self.affinity = affinity
+
+        self.worker_id = None
+        self.cores = machine_cores()
+        self.streams = 0
+        self.models = {"detector"}
+        self.threads = {}
+        self.version = 0
+        self._torch_version = None # allocation last applied to torch
+        self._lock = threading.Lock()
+
+    def _worker_cores(self, worker_id: int) -> list:
+        cores = machine_cores()
+        usable = cores[self.reserved:] if len(cores) > self.reserved else cores
+        if self.workers <= 1:
+            return usable
+        per_worker = max(1, len(usable) // self.workers)
+        start = (worker_id * per_worker) % len(usable)
+        return usable[start:start + per_worker]
+
+    def _plan(self):
+        """
+        Recompute per-model thread counts. Caller holds the lock.
+        """
+        if self.inference_threads:
+            total = self.inference_threads
+        else:
+            decode = math.ceil(self.streams * self.decode_per_stream)
+            total = max(1, len(self.cores) - decode)
+        weights = {m: MODEL_WEIGHTS.get(m, 1) for m in self.models}
+        norm = sum(weights.values())
+        threads = {m: max(1, total * w // norm) for m, w in weights.items()}
+        if threads != self.threads:
+            self.threads = threads
+            self.version += 1
+
+    def configure(self, worker_id: int = 0):
+        """
+        Claim this process's share of the machine. Call once at worker start,
+        before any model is loaded.
+        """
+        with self._lock:
+            self.worker_id = worker_id
+            self.cores = self._worker_cores(worker_id)
+            if settings.ACTION_RECOGNITION_ENABLED:
+                self.models.add("action_recognizer")
+            self._plan()
+            total = sum(self.threads.values())
+
+        if self.affinity and self.workers > 1 and hasattr(os, "sched_setaffinity"):
+            try:
+                os.sched_setaffinity(0, self.cores)
+            except OSError as e:
+                print(f"[!] Could not pin worker {worker_id} to cores {self.cores}: {e}")
+
+        # Pool sizes read once when torch / MKL / OpenMP initialize
+        for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+            os.environ.setdefault(var, str(total))
+        if self.opencv_threads:
+            import cv2
+            cv2.setNumThreads(self.opencv_threads)
+        print(f"[*] CPU budget for worker {worker_id}: cores {self.cores}, inference threads {self.threads}")
+        return self
+
+    def set_streams(self, streams: int):
+        """
+        Running streams in this process; each keeps some CPU for capture.
+        """
+        with self._lock:
+            self.streams = max(0, streams)
+            self._plan()
+
+    def threads_for(self, model: str) -> int:
+        with self._lock:
+            if model not in self.models:
+                self.models.add(model)
+                self._plan()
+            return self.threads[model]
+
+    def bind(self, model: str):
+        """
+        Register the model and apply the shared torch budget (the sum over all
+        models) if the allocation changed. Cheap when nothing changed; called
+        by the schedulers before every batch.
+        """
+        self.threads_for(model)
+        with self._lock:
+            if self._torch_version == self.version:
+                return
+            self._torch_version = self.version
+            threads = sum(self.threads.values())
+        torch = sys.modules.get("torch")
+        if torch is None:
+            return
+        torch.set_num_threads(threads)
+        if not getattr(CpuBudget, "_interop_set", False):
+            # Batches run one at a time per scheduler; a wide inter-op pool only adds threads
+            try:
+                torch.set_interop_threads(1)
+            except RuntimeError:
+                pass # already started by earlier torch work
+            CpuBudget._interop_set = True
+
+    def stats(self):
+        with self._lock:
+            return {
+                "worker": self.worker_id,
+                "cores": list(self.cores),
+                "pinned": self.affinity and self.workers > 1,
+                "streams": self.streams,
+                "inference_threads": dict(self.threads),
+                "torch_threads": sum(self.threads.values()),
+                "opencv_threads": self.opencv_threads,
+            }
+
+cpu_budget = CpuBudget(
+    reserved=settings.CPU_RESERVED_CORES,
+    workers=settings.WORKER_PROCESSES if settings.WORKER_MODE == "process" else 1,
+    decode_per_stream=settings.CPU_DECODE_CORES_PER_STREAM,
+    inference_threads=settings.CPU_INFERENCE_THREADS,
+    opencv_threads=settings.CPU_OPENCV_THREADS,
+    affinity=settings.CPU_AFFINITY
+)
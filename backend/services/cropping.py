@@ -0,0 +1,45 @@
+"""
+Crop helpers for running the detector on part of a frame.
+Crops keep the full-frame model scale: the input size shrinks in proportion
+to the crop and is snapped to a few buckets so crops from different streams
+can still share a batch.
+"""
+BASE_IMGSZ = 640
+IMGSZ_STEP = 160
+
+def union_region(regions):
+    """
+    Bounding box (x1, y1, x2, y2) of normalized regions, or None.
+    """
+    if not regions:
+        return None
+    return (
+        min(r[0] for r in regions), min(r[1] for r in regions),
+        max(r[2] for r in regions), max(r[3] for r in regions)
+    )
+
+def expand_region(region, margin=0.05):
+    x1, y1, x2, y2 = region
+    return (max(0.0, x1 - margin), max(0.0, y1 - margin), min(1.0, x2 + margin), min(1.0, y2 + margin))
+
+def region_area(region) -> float:
+    x1, y1, x2, y2 = region
+    return max(0.0, x2 - x1) * max(0.0, y2 - y1)
+
+def crop_for_inference(frame, region, base_imgsz=BASE_IMGSZ):
+    """
+    Crop a frame to a normalized region.
+    Returns: (crop, (x0, y0, sx, sy), imgsz) where the tuple feeds
+    Detections.remap() and imgsz is the model input size for the crop.
+    """
+    h, w = frame.shape[:2]
+    x1, y1, x2, y2 = region
+    px1, py1 = int(x1 * w), int(y1 * h)
+    px2, py2 = max(px1 + 1, int(x2 * w)), max(py1 + 1, int(y2 * h))
+    crop = frame[py1:py2, px1:px2]
+
+    # Same pixels-per-input-pixel as a full-frame pass, snapped to a bucket
+    scale = max((px2 - px1) / w, (py2 - py1) / h)
+    imgsz = min(base_imgsz, max(IMGSZ_STEP, -(-int(base_imgsz * scale) // IMGSZ_STEP) * IMGSZ_STEP))
+
+    return crop, (px1 / w, py1 / h, (px2 - px1) / w, (py2 - py1) / h), imgsz
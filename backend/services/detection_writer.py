@@ -0,0 +1,171 @@
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from uuid import UUID, uuid4
+from core.database import SessionLocal
+from models.detection import Detection
+from services import rollups
+
+class DetectionWriter:
+    """
+    Write-behind persistence for detections.
+    Stream processors enqueue rows into a bounded in-memory buffer and a
+    dedicated writer thread flushes them with one bulk INSERT (executemany)
+    whenever batch_size rows are pending or flush_interval_ms has elapsed.
+    Producers run on the stream event loops and never wait: when Postgres
+    falls behind and the buffer is full, rows are dropped immediately, which
+    is counted in stats(). Counters are only touched under the buffer lock.
+    """
+    def __init__(self, max_buffer=20000, batch_size=500, flush_interval_ms=1000):
+        self.max_buffer = max_buffer
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+
+        self._buffer = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.flushes = 0
+        self.last_flush_ms = 0.0
+
+        self._worker = threading.Thread(target=self._run, name="detection-writer", daemon=True)
+        self._worker.start()
+
+    def enqueue_detections(self, stream_id, detections, timestamp, frame_number=None):
+        """
+        Queue a columnar Detections result for bulk insert.
+        Returns: number of rows accepted
+        """
+        if len(detections) == 0:
+            return 0
+        sid = UUID(stream_id) if isinstance(stream_id, str) else stream_id
+        rows = [
+            {
+                "id": uuid4(),
+                "stream_id": sid,
+                "timestamp": timestamp,
+                "object_class": name,
+                "confidence": conf,
+                "bbox_json": {"x1": x1, "y1": y1, "x2": x2, "y2": y2},
+                "frame_number": frame_number,
+                "track_id": None,
+                "event": None
+            }
+            for name, conf, (x1, y1, x2, y2) in zip(
+                detections.class_names, detections.confidence.tolist(), detections.boxes.tolist()
+            )
+        ]
+        return self.enqueue(rows)
+
+    def enqueue_track_events(self, stream_id, events, names):
+        """
+        Queue tracker lifecycle events (see services/tracker.py), one row each.
+        Ids of the accepted rows are kept on the track (track.row_ids) so
+        actions can reference the detections they relate to.
+        Returns: number of rows accepted
+        """
+        if not events:
+            return 0
+        sid = UUID(stream_id) if isinstance(stream_id, str) else stream_id
+        rows = []
+        for event, track in events:
+            x1, y1, x2, y2 = track.box.tolist()
+            rows.append({
+                "id": uuid4(),
+                "stream_id": sid,
+                "timestamp": datetime.fromtimestamp(track.last_seen),
+                "object_class": names[track.class_id],
+                "confidence": track.confidence,
+                "bbox_json": {"x1": x1, "y1": y1, "x2": x2, "y2": y2},
+                "frame_number": track.frame_number,
+                "track_id": track.id,
+                "event": event
+            })
+        accepted = self.enqueue(rows)
+        # enqueue keeps a prefix of the rows; dropped ids would dangle
+        for (_, track), row in zip(events[:accepted], rows[:accepted]):
+            track.row_ids.append(row["id"])
+        return accepted
+
+    def enqueue(self, rows):
+        """
+        Buffer as many rows as fit, without blocking.
+        Returns: number of rows accepted (a prefix of rows)
+        """
+        with self._cond:
+            free = 0 if self._closed else max(0, self.max_buffer - len(self._buffer))
+            accepted = min(len(rows), free)
+            self._buffer.extend(rows[:accepted])
+            self.enqueued += accepted
+            self.dropped += len(rows) - accepted
+            if len(self._buffer) >= self.batch_size:
+                self._cond.notify_all()
+        return accepted
+
+    def _take_batch(self):
+        with self._cond:
+            deadline = time.monotonic() + self.flush_interval
+            while len(self._buffer) < self.batch_size and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            count = min(len(self._buffer), self.batch_size)
+            return [self._buffer.popleft() for _ in range(count)]
+
+    def _flush(self, batch):
+        start = time.perf_counter()
+        db = SessionLocal()
+        try:
+            db.execute(Detection.__table__.insert(), batch)
+            # Rollup counters commit atomically with the raw rows
+            rollups.record_detections(db, batch)
+            db.commit()
+            with self._cond:
+                self.written += len(batch)
+                self.flushes += 1
+        except Exception as e:
+            db.rollback()
+            with self._cond:
+                self.failed += len(batch)
+            print(f"[!] Detection writer flush failed ({len(batch)} rows): {e}")
+            time.sleep(min(self.flush_interval, 1.0))
+        finally:
+            db.close()
+        with self._cond:
+            self.last_flush_ms = (time.perf_counter() - start) * 1000
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if batch:
+                self._flush(batch)
+            elif self._closed:
+                return
+
+    def close(self, timeout=5.0):
+        """
+        Stop accepting rows and flush whatever is still buffered.
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._worker.join(timeout)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "pending": len(self._buffer),
+                "max_buffer": self.max_buffer,
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "flushes": self.flushes,
+                "last_flush_ms": round(self.last_flush_ms, 2),
+            }
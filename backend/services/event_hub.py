@@ -0,0 +1,247 @@
+"""
+Real-time fan-out of detection, action and alert events to /ws/stream/{stream_id}.
+The hub lives on the API event loop. Publishing only drops a message into
+each subscriber's bounded queue; every connection has its own sender task,
+so one slow client never stalls the others. When a queue is full, pending
+detection messages are coalesced (newest state per track wins) and, failing
+that, the oldest message is dropped.
+
+Stream processors call publish_event(). Inside the API process it goes
+straight to the hub; from worker processes (or a standalone ai_worker) it is
+relayed over Postgres NOTIFY on EVENT_CHANNEL by a background thread.
+"""
+import asyncio
+import queue
+import threading
+from collections import deque
+from core.config import settings
+from services.control_channel import create_channel
+
+EVENT_CHANNEL = "sentinel_events"
+TRACKS_PER_MESSAGE = 32 # keeps NOTIFY payloads well under the 8000 byte limit
+
+class Subscriber:
+    def __init__(self, websocket, stream_id: str, max_queue: int, send_timeout: float):
+        self.websocket = websocket
+        self.stream_id = stream_id
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self.queue = deque()
+        self.ready = asyncio.Event()
+        self.task = None
+
+        self.sent = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+    def offer(self, message: dict):
+        if len(self.queue) >= self.max_queue:
+            if message.get("type") == "detections" and self._coalesce(message):
+                self.coalesced += 1
+                self.ready.set()
+                return
+            self.queue.popleft()
+            self.dropped += 1
+        self.queue.append(message)
+        self.ready.set()
+
+    def _coalesce(self, message: dict) -> bool:
+        """
+        Fold a detections message into the newest pending one.
+        """
+        for i in range(len(self.queue) - 1, -1, -1):
+            pending = self.queue[i]
+            if pending.get("type") != "detections":
+                continue
+            if "tracks" in message and "tracks" in pending:
+                tracks = {t["track_id"]: t for t in pending["tracks"]}
+                tracks.update((t["track_id"], t) for t in message["tracks"])
+                self.queue[i] = {**message, "tracks": list(tracks.values())}
+            else:
+                # Per-frame snapshots: only the latest one matters
+                self.queue[i] = message
+            return True
+        return False
+
+    async def run(self):
+        while True:
+            await self.ready.wait()
+            self.ready.clear()
+            while self.queue:
+                message = self.queue.popleft()
+                await asyncio.wait_for(self.websocket.send_json(message), self.send_timeout)
+                self.sent += 1
+
+class BroadcastHub:
+    def __init__(self, max_queue=100, send_timeout=5.0):
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self.loop = None
+        self.subscribers = {} # stream_id -> set of Subscriber
+
+    def attach(self, loop):
+        """
+        Bind to the API event loop (lifespan startup).
+        """
+        self.loop = loop
+
+    def subscribe(self, websocket, stream_id: str) -> Subscriber:
+        subscriber = Subscriber(websocket, stream_id, self.max_queue, self.send_timeout)
+        self.subscribers.setdefault(stream_id, set()).add(subscriber)
+        subscriber.task = asyncio.create_task(self._serve(subscriber))
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        group = self.subscribers.get(subscriber.stream_id)
+        if group is not None:
+            group.discard(subscriber)
+            if not group:
+                self.subscribers.pop(subscriber.stream_id, None)
+        if subscriber.task is not None and not subscriber.task.done():
+            subscriber.task.cancel()
+
+    async def _serve(self, subscriber: Subscriber):
+        try:
+            await subscriber.run()
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            # Send failed or timed out: this client is gone or too slow
+            print(f"[!] WebSocket subscriber on {subscriber.stream_id} dropped: {e}")
+            self.unsubscribe(subscriber)
+            try:
+                await subscriber.websocket.close()
+            except Exception:
+                pass
+
+    def publish(self, message: dict):
+        """
+        Thread-safe; callable from stream threads and channel listeners.
+        """
+        if self.loop is None or not message.get("stream_id"):
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            self._fanout(message)
+        else:
+            self.loop.call_soon_threadsafe(self._fanout, message)
+
+    def _fanout(self, message: dict):
+        for subscriber in list(self.subscribers.get(message["stream_id"], ())):
+            subscriber.offer(message)
+
+    def stats(self):
+        return [
+            {
+                "stream_id": sub.stream_id,
+                "queued": len(sub.queue),
+                "sent": sub.sent,
+                "coalesced": sub.coalesced,
+                "dropped": sub.dropped,
+            }
+            for group in list(self.subscribers.values()) for sub in list(group)
+        ]
+
+class EventRelay:
+    """
+    Forwards events to the API process over NOTIFY from a background thread
+    so the stream loop never blocks on the database.
+    """
+    def __init__(self, channel, max_pending=1000):
+        self.channel = channel
+        self.pending = queue.Queue(max_pending)
+        self.dropped = 0
+        self._worker = threading.Thread(target=self._run, name="event-relay", daemon=True)
+        self._worker.start()
+
+    def publish(self, message: dict):
+        try:
+            self.pending.put_nowait(message)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        from core.database import SessionLocal
+        db = None
+        while True:
+            message = self.pending.get()
+            try:
+                if db is None:
+                    db = SessionLocal()
+                self.channel.publish(message, db)
+            except Exception as e:
+                print(f"[!] Event relay failed: {e}")
+                if db is not None:
+                    db.close()
+                db = None
+
+event_hub = BroadcastHub(max_queue=settings.EVENT_HUB_QUEUE_SIZE, send_timeout=settings.EVENT_HUB_SEND_TIMEOUT)
+event_channel = create_channel(settings.CONTROL_CHANNEL, EVENT_CHANNEL)
+_relay = None
+
+def publish_event(message: dict):
+    global _relay
+    if event_hub.loop is not None:
+        event_hub.publish(message)
+    elif settings.CONTROL_CHANNEL == "postgres":
+        if _relay is None:
+            _relay = EventRelay(event_channel)
+        _relay.publish(message)
+
+def track_messages(stream_id: str, events, names, timestamp) -> list:
+    """
+    Detection messages for tracker lifecycle events, chunked for NOTIFY.
+    """
+    tracks = [
+        {
+            "track_id": str(track.id),
+            "event": event,
+            "object_class": names[track.class_id],
+            "confidence": round(track.confidence, 3),
+            "bbox": [round(v, 4) for v in track.box.tolist()],
+        }
+        for event, track in events
+    ]
+    return [
+        {"type": "detections", "stream_id": stream_id, "timestamp": timestamp.isoformat(),
+         "tracks": tracks[i:i + TRACKS_PER_MESSAGE]}
+        for i in range(0, len(tracks), TRACKS_PER_MESSAGE)
+    ]
+
+def snapshot_message(stream_id: str, detections, timestamp) -> dict:
+    """
+    Detection message for an untracked per-frame result.
+    """
+    objects = detections.to_dicts()[:TRACKS_PER_MESSAGE]
+    return {"type": "detections", "stream_id": stream_id, "timestamp": timestamp.isoformat(), "objects": objects}
+
+def alert_message(stream_id: str, alert, timestamp) -> dict:
+    return {
+        "type": "alert",
+        "stream_id": stream_id,
+        "alert": {
+            "id": str(alert.id),
+            "alert_type": alert.alert_type,
+            "severity": alert.severity,
+            "description": alert.description,
+            "thumbnail_url": alert.thumbnail_url,
+            "created_at": timestamp.isoformat(),
+        },
+    }
+
+def action_message(stream_id: str, action, track) -> dict:
+    return {
+        "type": "action",
+        "stream_id": stream_id,
+        "action": {
+            "id": str(action.id),
+            "action_type": action.action_type,
+            "confidence": round(action.confidence, 3),
+            "track_id": str(track.id),
+            "bbox": [round(v, 4) for v in track.box.tolist()],
+            "timestamp": action.timestamp.isoformat(),
+        },
+    }
@@ -0,0 +1,298 @@
+"""
+Shared-memory frame bus.
+Each stream owns one SharedMemory segment laid out as a ring of fixed-size
+slots. The capture loop writes frames (raw BGR or encoded bytes) into the
+next slot with a sequence number; readers in any process attach by name
+and read the newest slot without going through Redis or a socket.
+
+Segment layout:
+    [ring header][slot header * slots][slot payload * slots]
+Slots use a seqlock: the slot seq is zeroed while the payload is written
+and set to the frame's sequence number afterwards, so readers can detect
+and retry torn reads.
+"""
+import os
+import time
+import numpy as np
+from multiprocessing import shared_memory
+from core.config import settings
+
+MAGIC = 0x53454E54 # "SENT"
+NAME_PREFIX = "sentinel_fb_"
+
+RING_HEADER = np.dtype([
+    ("magic", "<u4"),
+    ("closed", "<u4"),
+    ("slots", "<u4"),
+    ("_pad", "<u4"),
+    ("slot_size", "<u8"),
+    ("write_seq", "<u8"),
+    ("reader_heartbeat", "<f8"),
+    ("token", "<u8"),
+])
+
+SLOT_HEADER = np.dtype([
+    ("seq", "<u8"),
+    ("nbytes", "<u8"),
+    ("height", "<u4"),
+    ("width", "<u4"),
+    ("channels", "<u4"),
+    ("encoded", "<u4"),
+    ("timestamp", "<f8"),
+])
+
+def segment_name(stream_id: str) -> str:
+    return NAME_PREFIX + str(stream_id).replace("-", "")
+
+def _attach_untracked(name):
+    # Readers must not let the resource tracker unlink a segment they do not own
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError: # Python < 3.13
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        return shm
+
+class FrameRing:
+    def __init__(self, shm, owner=False):
+        self.shm = shm
+        self.owner = owner
+        self.header = np.ndarray((1,), dtype=RING_HEADER, buffer=shm.buf)[0:1]
+        slots = int(self.header["slots"][0])
+        self.slots = slots
+        self.slot_size = int(self.header["slot_size"][0])
+        self.token = int(self.header["token"][0])
+        self.slot_headers = np.ndarray((slots,), dtype=SLOT_HEADER, buffer=shm.buf, offset=RING_HEADER.itemsize)
+        payload_offset = RING_HEADER.itemsize + SLOT_HEADER.itemsize * slots
+        self.payload = np.ndarray((slots, self.slot_size), dtype=np.uint8, buffer=shm.buf, offset=payload_offset)
+
+    @classmethod
+    def create(cls, stream_id: str, slots: int, slot_size: int):
+        name = segment_name(stream_id)
+        size = RING_HEADER.itemsize + (SLOT_HEADER.itemsize + slot_size) * slots
+        try:
+            # Stale segment from a crashed writer
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+        except FileNotFoundError:
+            pass
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        header = np.ndarray((1,), dtype=RING_HEADER, buffer=shm.buf)
+        # Random token identifies this incarnation of the segment name
+        token = int.from_bytes(os.urandom(8), "little")
+        header[0] = (MAGIC, 0, slots, 0, slot_size, 0, 0.0, token)
+        np.ndarray((slots,), dtype=SLOT_HEADER, buffer=shm.buf, offset=RING_HEADER.itemsize)[:] = 0
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, stream_id: str):
+        shm = _attach_untracked(segment_name(stream_id))
+        if int(np.ndarray((1,), dtype=RING_HEADER, buffer=shm.buf)["magic"][0]) != MAGIC:
+            shm.close()
+            raise FileNotFoundError(segment_name(stream_id))
+        return cls(shm)
+
+    @property
+    def closed(self) -> bool:
+        return bool(self.header["closed"][0])
+
+    @property
+    def write_seq(self) -> int:
+        return int(self.header["write_seq"][0])
+
+    def touch(self):
+        """
+        Reader heartbeat: tells the writer someone is consuming this ring.
+        """
+        self.header["reader_heartbeat"] = time.time()
+
+    def has_readers(self, within: float) -> bool:
+        return time.time() - float(self.header["reader_heartbeat"][0]) <= within
+
+    # Writer side
+
+    def write(self, frame, encoded=False):
+        """
+        Copy a frame (ndarray) or encoded buffer (bytes / 1-D array) into the
+        next slot. Returns: sequence number of the written frame
+        """
+        data = np.frombuffer(frame, dtype=np.uint8) if isinstance(frame, (bytes, bytearray, memoryview)) else frame
+        nbytes = data.nbytes
+        if nbytes > self.slot_size:
+            raise ValueError(f"frame of {nbytes} bytes exceeds slot size {self.slot_size}")
+        encoded = encoded or data.ndim == 1
+        seq = self.write_seq + 1
+        idx = seq % self.slots
+        self.slot_headers["seq"][idx] = 0 # mark in progress
+        np.copyto(self.payload[idx, :nbytes].reshape(data.shape), data)
+
+        shape = data.shape
+        slot = self.slot_headers[idx:idx + 1]
+        slot["nbytes"] = nbytes
+        slot["height"] = shape[0] if len(shape) > 1 else 0
+        slot["width"] = shape[1] if len(shape) > 1 else 0
+        slot["channels"] = shape[2] if len(shape) > 2 else 1
+        slot["encoded"] = 1 if encoded else 0
+        slot["timestamp"] = time.time()
+        slot["seq"] = seq
+        self.header["write_seq"] = seq
+        return seq
+
+    # Reader side
+
+    def read(self, seq=None, out=None):
+        """
+        Read the newest frame (or a specific seq if still in the ring).
+        Returns: (seq, frame, meta) or None when nothing is available.
+        The frame is always a copy, since the slot is overwritten when the
+        ring wraps; a preallocated out array of matching shape is reused.
+        """
+        for _ in range(3):
+            target = seq if seq is not None else self.write_seq
+            if target == 0:
+                return None
+            idx = target % self.slots
+            before = int(self.slot_headers["seq"][idx])
+            if before != target:
+                if seq is not None:
+                    return None # overwritten or not yet written
+                continue
+            meta = self.slot_headers[idx]
+            nbytes = int(meta["nbytes"])
+            encoded = bool(meta["encoded"])
+            if encoded:
+                frame = self.payload[idx, :nbytes]
+            else:
+                shape = (int(meta["height"]), int(meta["width"]), int(meta["channels"]))
+                frame = self.payload[idx, :nbytes].reshape(shape)
+            if out is not None and out.shape == frame.shape:
+                np.copyto(out, frame)
+                frame = out
+            else:
+                frame = frame.copy()
+            timestamp = float(meta["timestamp"])
+            if int(self.slot_headers["seq"][idx]) == before:
+                return target, frame, {"encoded": encoded, "timestamp": timestamp}
+        return None
+
+    def close(self):
+        if self.owner:
+            self.header["closed"] = 1
+        # Drop numpy views before releasing the mapping
+        self.header = self.slot_headers = self.payload = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass # a view is still referenced somewhere; mapping goes with it
+        if self.owner and self._name_is_ours():
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+    def _name_is_ours(self) -> bool:
+        # Another process may have re-created the segment under the same name
+        # (e.g. the stream moved to a different worker); never unlink theirs
+        try:
+            shm = _attach_untracked(self.shm.name)
+        except FileNotFoundError:
+            return False
+        try:
+            header = np.ndarray((1,), dtype=RING_HEADER, buffer=shm.buf)
+            ours = int(header["token"][0]) == self.token
+            del header
+        finally:
+            shm.close()
+        return ours
+
+class FrameBus:
+    """
+    Per-process registry of frame rings: writers for the streams this
+    process captures, readers for the streams it consumes.
+    """
+    def __init__(self, slots=4, min_slot_size=0):
+        self.slots = slots
+        self.min_slot_size = min_slot_size
+        self._writers = {}
+        self._readers = {}
+
+    def writer(self, stream_id: str, nbytes: int, encoded=False):
+        ring = self._writers.get(stream_id)
+        if ring is None or nbytes > ring.slot_size:
+            # First frame or resolution grew: (re)create the segment.
+            # Encoded frames vary in size, so leave headroom to avoid churn.
+            if ring is not None:
+                ring.close()
+            slot_size = nbytes * 3 // 2 if encoded else nbytes
+            ring = FrameRing.create(stream_id, self.slots, max(slot_size, self.min_slot_size))
+            self._writers[stream_id] = ring
+        return ring
+
+    def publish(self, stream_id: str, frame, encoded=False):
+        nbytes = len(frame) if isinstance(frame, (bytes, bytearray, memoryview)) else frame.nbytes
+        return self.writer(stream_id, nbytes, encoded).write(frame, encoded=encoded)
+
+    def reader(self, stream_id: str):
+        ring = self._readers.get(stream_id)
+        if ring is not None and ring.closed:
+            ring.close()
+            ring = None
+        if ring is None:
+            try:
+                ring = FrameRing.attach(stream_id)
+            except FileNotFoundError:
+                self._readers.pop(stream_id, None)
+                return None
+            self._readers[stream_id] = ring
+        return ring
+
+    def _ring(self, stream_id: str):
+        return self._writers.get(stream_id) or self.reader(stream_id)
+
+    def wanted(self, stream_id: str, within: float = 2.0) -> bool:
+        """
+        Writer side: whether any consumer has read this stream recently.
+        Lets the capture loop skip publishing when nobody is watching.
+        """
+        ring = self._writers.get(stream_id)
+        return ring is None or ring.has_readers(within)
+
+    def available(self, stream_id: str) -> bool:
+        """
+        Whether a capture loop is publishing this stream (attaches if needed).
+        """
+        return self._ring(stream_id) is not None
+
+    def seq(self, stream_id: str):
+        """
+        Newest sequence number for a stream (0 before the first frame, None
+        without a ring); counts as a read.
+        """
+        ring = self._ring(stream_id)
+        if ring is None:
+            return None
+        ring.touch()
+        return ring.write_seq
+
+    def latest(self, stream_id: str, out=None):
+        """
+        Returns: (seq, frame, meta) for the newest frame of a stream, or None
+        """
+        ring = self._ring(stream_id)
+        if ring is None:
+            return None
+        ring.touch()
+        return ring.read(out=out)
+
+    def close(self, stream_id: str):
+        ring = self._writers.pop(stream_id, None)
+        if ring is not None:
+            ring.close()
+
+# Process-wide bus shared by capture loops and API consumers
+frame_bus = FrameBus(slots=settings.FRAME_BUS_SLOTS)
@@ -0,0 +1,123 @@
+import threading
+import time
+from core.config import settings
+
+class DetectionBudget:
+    """
+    Node-wide detections-per-second target shared by every stream sampler in
+    this process (the node budget split evenly across worker processes).
+    When the streams together ask for more than the budget, each stream's
+    rate is scaled by the same factor, so active scenes keep a larger share
+    than idle ones. fps=0 disables the cap.
+    """
+    def __init__(self, fps=0.0, workers=1, refresh=0.5):
+        self.fps = fps / max(1, workers)
+        self.refresh = refresh
+        self.samplers = {} # stream_id -> AdaptiveFrameScheduler
+        self._scale = 1.0
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def register(self, stream_id: str, sampler):
+        with self._lock:
+            self.samplers[stream_id] = sampler
+        sampler.budget = self
+
+    def release(self, stream_id: str):
+        with self._lock:
+            self.samplers.pop(stream_id, None)
+
+    def demand(self) -> float:
+        with self._lock:
+            return sum(s.rate for s in self.samplers.values())
+
+    def scale(self, now: float) -> float:
+        """
+        Factor applied to every stream's rate; recomputed at most every refresh seconds.
+        """
+        if not self.fps:
+            return 1.0
+        if now - self._checked >= self.refresh:
+            demand = self.demand()
+            self._scale = 1.0 if demand <= self.fps else self.fps / demand
+            self._checked = now
+        return self._scale
+
+    def stats(self):
+        return {
+            "budget_fps": self.fps,
+            "demand_fps": round(self.demand(), 2),
+            "scale": round(self._scale, 3),
+            "streams": len(self.samplers),
+        }
+
+class AdaptiveFrameScheduler:
+    """
+    Per-stream inference sampling.
+    Instead of a fixed every-Nth-frame rule, inference runs at a target rate
+    (inferences per second) that ramps to max_fps as soon as a frame shows
+    activity, holds there for hold_seconds, then decays geometrically towards
+    idle_fps on a quiet scene. The rate is also capped by the measured
+    inference latency, so a node that falls behind samples less instead of
+    queueing more work, and scaled down by the shared DetectionBudget when
+    all streams together exceed the node's detections-per-second target.
+    """
+    def __init__(self, max_fps=6.0, idle_fps=0.5, hold_seconds=10.0, backoff=0.7, latency_headroom=2.0):
+        self.max_fps = max_fps
+        self.idle_fps = min(idle_fps, max_fps)
+        self.hold_seconds = hold_seconds
+        self.backoff = backoff
+        self.latency_headroom = latency_headroom
+
+        self.rate = max_fps
+        self.latency = 0.0 # EWMA, seconds
+        self.last_run = 0.0
+        self.last_activity = time.monotonic()
+        self.budget = None # set by DetectionBudget.register
+
+        self.frames = 0
+        self.inferences = 0
+
+    def should_infer(self, now=None) -> bool:
+        now = now if now is not None else time.monotonic()
+        self.frames += 1
+        rate = self.rate * self.budget.scale(now) if self.budget is not None else self.rate
+        if now - self.last_run >= 1.0 / rate:
+            self.last_run = now
+            self.inferences += 1
+            return True
+        return False
+
+    def record(self, latency: float, active: bool, now=None):
+        """
+        Feed back one inference: its latency (seconds, including queueing;
+        None when the detector was skipped) and whether the scene showed
+        activity (detections or motion).
+        """
+        now = now if now is not None else time.monotonic()
+        if latency is not None:
+            self.latency = latency if self.latency == 0 else 0.8 * self.latency + 0.2 * latency
+
+        if active:
+            self.last_activity = now
+            self.rate = self.max_fps
+        elif now - self.last_activity > self.hold_seconds:
+            self.rate = max(self.idle_fps, self.rate * self.backoff)
+
+        # Never schedule faster than the node can actually serve
+        if self.latency > 0:
+            self.rate = max(self.idle_fps, min(self.rate, 1.0 / (self.latency * self.latency_headroom)))
+
+    def stats(self):
+        return {
+            "rate_fps": round(self.rate, 2),
+            "latency_ms": round(self.latency * 1000, 1),
+            "frames": self.frames,
+            "inferences": self.inferences,
+            "sample_ratio": round(self.inferences / self.frames, 3) if self.frames else 0.0,
+        }
+
+detection_budget = DetectionBudget(
+    fps=settings.INFERENCE_NODE_BUDGET_FPS,
+    workers=settings.WORKER_PROCESSES if settings.WORKER_MODE == "process" else 1
+)
@@ -0,0 +1,146 @@
+import queue
+import threading
+import time
+import asyncio
+from collections import deque
+from concurrent.futures import Future, InvalidStateError
+from services.cpu_budget import cpu_budget
+
+class InferenceScheduler:
+    """
+    Central batching scheduler shared by all stream processors.
+    Frames submitted from any stream thread are collected into a single
+    queue and run through the detector as one batch, bounded by
+    max_batch_size and max_wait_ms. Each caller gets its own result back.
+    batch_fn(items, imgsz) overrides detector.detect_batch, so the same
+    scheduler batches other models (e.g. action clips).
+    """
+    def __init__(self, detector, max_batch_size=8, max_wait_ms=10, history=200, batch_fn=None, name=None):
+        self.detector = detector
+        self.name = name # CPU budget key (services/cpu_budget.py)
+        self.batch_fn = batch_fn or (lambda frames, imgsz: detector.detect_batch(frames, imgsz=imgsz))
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0, max_wait_ms) / 1000.0
+        self.queue = queue.Queue()
+
+        # Per-batch metrics: (batch_size, latency_ms)
+        self._history = deque(maxlen=history)
+        self._total_batches = 0
+        self._total_frames = 0
+        self._lock = threading.Lock()
+
+        self._worker = threading.Thread(target=self._run, name="inference-scheduler", daemon=True)
+        self._worker.start()
+
+    def submit(self, stream_id, frame, imgsz=None):
+        """
+        Queue a frame for batched inference. imgsz overrides the model input
+        size (used for cropped inputs); frames are batched per input size.
+        Returns: concurrent.futures.Future resolving to the detection list
+        """
+        future = Future()
+        self.queue.put((stream_id, frame, imgsz, future))
+        return future
+
+    async def detect(self, stream_id, frame, imgsz=None):
+        """
+        Awaitable wrapper around submit() for the per-stream asyncio loops.
+        """
+        return await asyncio.wrap_future(self.submit(stream_id, frame, imgsz))
+
+    def _collect_batch(self):
+        # Block until at least one frame is available
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            groups = {}
+            # Claim each future; callers that went away (cancelled task) are skipped
+            batch = [item for item in self._collect_batch() if item[3].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            if self.name:
+                cpu_budget.bind(self.name)
+            for item in batch:
+                groups.setdefault(item[2], []).append(item)
+            for imgsz, batch in groups.items():
+                self._infer(batch, imgsz)
+
+    def _infer(self, batch, imgsz):
+        frames = [frame for _, frame, _, _ in batch]
+        start = time.perf_counter()
+        try:
+            results = self.batch_fn(frames, imgsz)
+        except Exception as e:
+            print(f"[!] Batched inference failed ({len(batch)} frames): {e}")
+            for _, _, _, future in batch:
+                self._resolve(future, exception=e)
+            return
+        latency_ms = (time.perf_counter() - start) * 1000
+
+        for (_, _, _, future), result in zip(batch, results):
+            self._resolve(future, result)
+
+        with self._lock:
+            self._history.append((len(batch), latency_ms))
+            self._total_batches += 1
+            self._total_frames += len(batch)
+
+    @staticmethod
+    def _resolve(future, result=None, exception=None):
+        # Never let one caller's future take the scheduler thread down
+        try:
+            if exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(result)
+        except InvalidStateError:
+            pass
+
+    def stats(self):
+        """
+        Snapshot of recent batching behaviour for tuning
+        max_batch_size / max_wait_ms.
+        """
+        with self._lock:
+            history = list(self._history)
+            total_batches = self._total_batches
+            total_frames = self._total_frames
+
+        if not history:
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+                "total_batches": total_batches,
+                "total_frames": total_frames,
+                "queue_depth": self.queue.qsize(),
+                "avg_batch_size": 0.0,
+                "avg_fill_ratio": 0.0,
+                "avg_latency_ms": 0.0,
+                "last_latency_ms": 0.0,
+            }
+
+        sizes = [size for size, _ in history]
+        latencies = [latency for _, latency in history]
+        avg_size = sum(sizes) / len(sizes)
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "total_batches": total_batches,
+            "total_frames": total_frames,
+            "queue_depth": self.queue.qsize(),
+            "avg_batch_size": round(avg_size, 2),
+            "avg_fill_ratio": round(avg_size / self.max_batch_size, 3),
+            "avg_latency_ms": round(sum(latencies) / len(latencies), 2),
+            "last_latency_ms": round(latencies[-1], 2),
+        }
@@ -0,0 +1,95 @@
+"""
+Process-wide registry of loaded models and their schedulers.
+Nothing is loaded at import time: each entry is built by its factory on the
+first get(), exactly once per process (concurrent callers wait for the same
+load), and the load time is recorded for /api/health. The API process only
+imports this module, so it never pays for torch / ultralytics unless it runs
+streams itself.
+
+Weights and exported artifacts (ONNX, INT8) live in MODEL_CACHE_DIR, so after
+the first download a node starts offline.
+"""
+import os
+import threading
+import time
+from core.config import settings
+
+def cached_path(name: str) -> str:
+    """
+    Location of a weights file or artifact inside MODEL_CACHE_DIR (absolute
+    and already existing paths are used as given).
+    """
+    if os.path.isabs(name) or os.path.exists(name):
+        return name
+    os.makedirs(settings.MODEL_CACHE_DIR, exist_ok=True)
+    return os.path.join(settings.MODEL_CACHE_DIR, name)
+
+class ModelRegistry:
+    def __init__(self):
+        self._factories = {}
+        self._instances = {}
+        self._locks = {}
+        self._load_ms = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory):
+        with self._lock:
+            self._factories[name] = factory
+            self._locks[name] = threading.Lock()
+
+    def get(self, name: str):
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        with self._locks[name]:
+            instance = self._instances.get(name)
+            if instance is None:
+                start = time.perf_counter()
+                instance = self._factories[name]()
+                self._load_ms[name] = (time.perf_counter() - start) * 1000
+                self._instances[name] = instance
+                print(f"[+] Loaded {name} in {self._load_ms[name]:.0f} ms")
+        return instance
+
+    def peek(self, name: str):
+        """
+        The instance if it is already loaded, without loading it.
+        """
+        return self._instances.get(name)
+
+    def stats(self):
+        return {
+            name: {"loaded": name in self._instances, "load_ms": round(self._load_ms[name], 1) if name in self._load_ms else None}
+            for name in list(self._factories)
+        }
+
+models = ModelRegistry()
+
+def _detector():
+    from services.yolo_detector import YoloDetector
+    from services.cpu_budget import cpu_budget
+    # ONNX Runtime sizes its pool at session creation; torch is bound per batch
+    threads = settings.DETECTOR_THREADS or cpu_budget.threads_for("detector")
+    return YoloDetector(cached_path(settings.DETECTOR_MODEL), threads=threads)
+
+def _detection_scheduler():
+    from services.inference_scheduler import InferenceScheduler
+    return InferenceScheduler(
+        models.get("detector"),
+        max_batch_size=settings.INFERENCE_MAX_BATCH_SIZE,
+        max_wait_ms=settings.INFERENCE_MAX_WAIT_MS,
+        name="detector"
+    )
+
+def _action_recognizer():
+    from services.action_recognizer import ActionRecognizer
+    return ActionRecognizer(cache_dir=settings.MODEL_CACHE_DIR)
+
+def _action_scheduler():
+    from services.action_recognizer import make_action_scheduler
+    return make_action_scheduler(models.get("action_recognizer"))
+
+models.register("detector", _detector)
+models.register("detection_scheduler", _detection_scheduler)
+models.register("action_recognizer", _action_recognizer)
+models.register("action_scheduler", _action_scheduler)
@@ -0,0 +1,95 @@
+import time
+import cv2
+import numpy as np
+
+class MotionGate:
+    """
+    Cheap change detector run before the object detector.
+    Works on a small grayscale copy of the frame against a running-average
+    background; when too few pixels changed the detector call is skipped.
+    Changed regions are returned (normalized xyxy) so inference can be
+    restricted to them. A forced pass every force_interval seconds keeps
+    stationary objects from going unseen forever.
+    """
+    def __init__(self, width=160, pixel_threshold=25, min_area=0.002, learning_rate=0.05, force_interval=30.0):
+        self.width = width
+        self.pixel_threshold = pixel_threshold
+        self.min_area = min_area
+        self.learning_rate = learning_rate
+        self.force_interval = force_interval
+
+        self.background = None
+        self.zone_polygons = None
+        self.zone_mask = None
+        self.last_pass = 0.0
+        self.kernel = np.ones((3, 3), np.uint8)
+
+        self.checks = 0
+        self.skipped = 0
+
+    def set_zones(self, polygons):
+        """
+        Only count changes inside these normalized polygons.
+        """
+        self.zone_polygons = polygons or None
+        self.zone_mask = None
+
+    def _build_zone_mask(self, shape):
+        h, w = shape
+        mask = np.zeros((h, w), dtype=np.uint8)
+        scale = np.array([w, h], dtype=np.float32)
+        cv2.fillPoly(mask, [np.round(p * scale).astype(np.int32) for p in self.zone_polygons], 255)
+        return mask
+
+    def _small_gray(self, frame):
+        h, w = frame.shape[:2]
+        small = cv2.resize(frame, (self.width, max(1, int(h * self.width / w))), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def check(self, frame, now=None):
+        """
+        Returns: (run_detector, regions) where regions is a list of
+        normalized (x1, y1, x2, y2) boxes that changed, or None for "whole frame".
+        """
+        now = now if now is not None else time.monotonic()
+        self.checks += 1
+        gray = self._small_gray(frame)
+
+        if self.background is None or self.background.shape != gray.shape:
+            self.background = gray.astype(np.float32)
+            self.last_pass = now
+            return True, None
+
+        diff = cv2.absdiff(gray, cv2.convertScaleAbs(self.background))
+        if self.zone_polygons is not None:
+            if self.zone_mask is None or self.zone_mask.shape != diff.shape:
+                self.zone_mask = self._build_zone_mask(diff.shape)
+            diff = cv2.bitwise_and(diff, diff, mask=self.zone_mask)
+        cv2.accumulateWeighted(gray, self.background, self.learning_rate)
+        _, mask = cv2.threshold(diff, self.pixel_threshold, 255, cv2.THRESH_BINARY)
+        changed = cv2.countNonZero(mask) / mask.size
+
+        if changed < self.min_area:
+            if now - self.last_pass >= self.force_interval:
+                self.last_pass = now
+                return True, None
+            self.skipped += 1
+            return False, []
+
+        self.last_pass = now
+        mask = cv2.dilate(mask, self.kernel, iterations=2)
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        mh, mw = mask.shape
+        regions = []
+        for contour in contours:
+            x, y, w, h = cv2.boundingRect(contour)
+            regions.append((x / mw, y / mh, (x + w) / mw, (y + h) / mh))
+        return True, regions
+
+    def stats(self):
+        return {
+            "motion_checks": self.checks,
+            "motion_skipped": self.skipped,
+            "motion_skip_ratio": round(self.skipped / self.checks, 3) if self.checks else 0.0,
+        }
@@ -0,0 +1,157 @@
+"""
+Daily range-partition maintenance for the detections and alerts tables.
+Creates partitions ahead of time and enforces retention by dropping whole
+partitions instead of running DELETE over millions of rows.
+
+Each table also has a DEFAULT partition that catches rows with no dated
+partition yet (clock skew, late premake). Those rows are moved into the dated
+partition when it is created, and expired ones are deleted by retention.
+Minute-granularity rollups (services/rollups.py) are pruned by the same job.
+"""
+from datetime import date, datetime, timedelta
+from sqlalchemy import text
+from core.config import settings
+from core.database import SessionLocal
+from services import rollups
+
+# parent table -> (partition key, retention setting name)
+PARTITIONED_TABLES = {
+    "detections": ("timestamp", "DETECTION_RETENTION_DAYS"),
+    "alerts": ("created_at", "ALERT_RETENTION_DAYS"),
+}
+
+def partition_name(table: str, day: date) -> str:
+    return f"{table}_p{day:%Y%m%d}"
+
+def default_partition_name(table: str) -> str:
+    return f"{table}_default"
+
+def list_partitions(db, table: str):
+    """
+    Returns: {partition_day: partition_name} for the dated children of table
+    """
+    rows = db.execute(text("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE p.relname = :parent
+    """), {"parent": table}).scalars().all()
+
+    partitions = {}
+    prefix = f"{table}_p"
+    for name in rows:
+        if not name.startswith(prefix):
+            continue # e.g. the default partition
+        try:
+            partitions[datetime.strptime(name[len(prefix):], "%Y%m%d").date()] = name
+        except ValueError:
+            continue
+    return partitions
+
+def _create_partition(db, table: str, key: str, day: date):
+    """
+    Create the partition for one day. CREATE ... PARTITION OF fails while the
+    default partition holds rows of that range, so such rows are first moved
+    into a standalone table which is then attached.
+    """
+    name = partition_name(table, day)
+    default = default_partition_name(table)
+    lower, upper = day.isoformat(), (day + timedelta(days=1)).isoformat()
+    bounds = f"FOR VALUES FROM ('{lower}') TO ('{upper}')"
+    has_default = db.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": default}).scalar()
+    stray = has_default and db.execute(text(
+        f'SELECT EXISTS (SELECT 1 FROM "{default}" WHERE "{key}" >= :lower AND "{key}" < :upper)'
+    ), {"lower": lower, "upper": upper}).scalar()
+
+    if not stray:
+        db.execute(text(f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{table}" {bounds}'))
+        return 0
+
+    db.execute(text(f'CREATE TABLE "{name}" (LIKE "{table}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'))
+    moved = db.execute(text(
+        f'WITH moved AS (DELETE FROM "{default}" WHERE "{key}" >= :lower AND "{key}" < :upper RETURNING *) '
+        f'INSERT INTO "{name}" SELECT * FROM moved'
+    ), {"lower": lower, "upper": upper}).rowcount
+    db.execute(text(f'ALTER TABLE "{table}" ATTACH PARTITION "{name}" {bounds}'))
+    return moved
+
+def ensure_partitions(db, table: str, start: date, end: date, key: str = None):
+    """
+    Create one partition per day in [start, end] that does not exist yet.
+    """
+    key = key or PARTITIONED_TABLES[table][0]
+    existing = list_partitions(db, table)
+    created = []
+    day = start
+    while day <= end:
+        if day not in existing:
+            moved = _create_partition(db, table, key, day)
+            if moved:
+                print(f"[*] Moved {moved} rows from {default_partition_name(table)} into {partition_name(table, day)}")
+            created.append(partition_name(table, day))
+        day += timedelta(days=1)
+    return created
+
+def drop_expired_partitions(db, table: str, retention_days: int, today: date = None, key: str = None):
+    """
+    Drop partitions whose whole day range is older than the retention window,
+    and delete expired rows that landed in the default partition.
+    """
+    key = key or PARTITIONED_TABLES[table][0]
+    today = today or date.today()
+    cutoff = today - timedelta(days=retention_days)
+    dropped = []
+    for day, name in sorted(list_partitions(db, table).items()):
+        if day + timedelta(days=1) <= cutoff:
+            db.execute(text(f'ALTER TABLE "{table}" DETACH PARTITION "{name}"'))
+            db.execute(text(f'DROP TABLE "{name}"'))
+            dropped.append(name)
+
+    default = default_partition_name(table)
+    if db.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": default}).scalar():
+        deleted = db.execute(text(f'DELETE FROM "{default}" WHERE "{key}" < :cutoff'), {"cutoff": cutoff.isoformat()}).rowcount
+        if deleted:
+            dropped.append(f"{deleted} rows from {default}")
+    return dropped
+
+def _run_step(db, label: str, step):
+    """
+    Run one maintenance step in its own transaction, so a failure (e.g. in
+    partition creation) does not roll back the others.
+    """
+    try:
+        result = step()
+        db.commit()
+        return result
+    except Exception as e:
+        print(f"[!] Partition maintenance failed ({label}): {e}")
+        db.rollback()
+        return None
+
+def maintain_partitions():
+    """
+    Premake upcoming partitions and drop expired ones for every partitioned table.
+    """
+    today = date.today()
+    db = SessionLocal()
+    try:
+        for table, (key, retention_attr) in PARTITIONED_TABLES.items():
+            created = _run_step(db, f"create {table}", lambda: ensure_partitions(
+                db, table, today, today + timedelta(days=settings.PARTITION_PREMAKE_DAYS), key=key))
+            dropped = _run_step(db, f"retention {table}", lambda: drop_expired_partitions(
+                db, table, getattr(settings, retention_attr), today, key=key))
+            if created:
+                print(f"[+] Created {len(created)} partitions for {table}")
+            if dropped:
+                print(f"[*] Retention: dropped {', '.join(dropped)}")
+
+        before = datetime.now() - timedelta(hours=settings.ROLLUP_MINUTE_RETENTION_HOURS)
+        pruned = _run_step(db, "minute rollups", lambda: rollups.prune_minutes(db, before))
+        if pruned:
+            print(f"[*] Retention: deleted {pruned} minute rollups")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    maintain_partitions()
@@ -0,0 +1,146 @@
+"""
+On-demand JPEG encoding for live MJPEG viewers.
+One PreviewChannel per (stream, rendition) exists only while it has
+subscribers. It watches the frame bus sequence number, encodes each new raw
+frame at most once for that rendition (width / fps) and wakes every viewer
+of it, so a 36-tile wall at 320px shares a single small encode per stream.
+When the stream's ring goes away (stream stopped) the channel retries the
+attach at most twice a second and ends after MISSING_GRACE seconds, which
+also ends its viewers' responses.
+"""
+import asyncio
+import cv2
+import numpy as np
+from core.config import settings
+from services.frame_bus import frame_bus
+
+MISSING_GRACE = 2.0 # seconds without a ring before viewers are disconnected
+MISSING_RETRY = 0.5
+
+def encode_preview(frame, max_width: int, quality: int):
+    h, w = frame.shape[:2]
+    if max_width and w > max_width:
+        frame = cv2.resize(frame, (max_width, int(h * max_width / w)), interpolation=cv2.INTER_AREA)
+    ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return buffer.tobytes() if ok else None
+
+class PreviewChannel:
+    def __init__(self, stream_id: str, max_width: int, quality: int, fps: int):
+        self.stream_id = stream_id
+        self.max_width = max_width
+        self.quality = quality
+        self.interval = 1.0 / max(1, fps)
+        self.subscribers = 0
+        self.seq = 0
+        self.jpeg = None
+        self.cond = asyncio.Condition()
+        self.task = None
+        self.ended = False
+        # Reused between frames: raw copy out of the bus and the resized image
+        self.raw = None
+        self.scaled = None
+
+    def _encode(self, frame):
+        h, w = frame.shape[:2]
+        if self.max_width and w > self.max_width:
+            size = (self.max_width, int(h * self.max_width / w))
+            shape = (size[1], size[0]) + frame.shape[2:]
+            if self.scaled is None or self.scaled.shape != shape:
+                self.scaled = np.empty(shape, dtype=frame.dtype)
+            frame = cv2.resize(frame, size, dst=self.scaled, interpolation=cv2.INTER_AREA)
+        return encode_preview(frame, 0, self.quality)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        missing_since = None
+        while self.subscribers > 0:
+            # Cheap integer check; the frame is only read and encoded when it changed
+            seq = frame_bus.seq(self.stream_id)
+            if seq is None:
+                missing_since = missing_since or loop.time()
+                if loop.time() - missing_since >= MISSING_GRACE:
+                    break
+                await asyncio.sleep(max(self.interval, MISSING_RETRY))
+                continue
+            missing_since = None
+            if seq != self.seq:
+                latest = frame_bus.latest(self.stream_id, out=self.raw)
+                if latest is not None:
+                    seq, frame, meta = latest
+                    if meta["encoded"]:
+                        jpeg = frame.tobytes()
+                    else:
+                        self.raw = frame
+                        jpeg = await loop.run_in_executor(None, self._encode, frame)
+                    if jpeg is not None:
+                        async with self.cond:
+                            self.seq, self.jpeg = seq, jpeg
+                            self.cond.notify_all()
+            await asyncio.sleep(self.interval)
+        async with self.cond:
+            self.ended = True
+            self.cond.notify_all()
+
+    async def frames(self):
+        """
+        Yield each newly encoded JPEG; waits on the channel instead of polling.
+        Returns when the stream stops publishing.
+        """
+        last = 0
+        while True:
+            async with self.cond:
+                await self.cond.wait_for(lambda: self.seq != last or self.ended)
+                if self.ended:
+                    return
+                last, jpeg = self.seq, self.jpeg
+            yield jpeg
+
+class PreviewHub:
+    def __init__(self, max_width: int, quality: int, fps: int):
+        self.max_width = max_width
+        self.quality = quality
+        self.fps = fps
+        self.channels = {} # (stream_id, width, fps) -> PreviewChannel
+
+    def rendition(self, width: int = None, fps: int = None):
+        """
+        Normalize a requested rendition so similar requests share a channel.
+        Width is clamped to the preview max and snapped to a multiple of 32.
+        """
+        width = min(width or self.max_width, self.max_width)
+        width = max(32, width - width % 32)
+        fps = max(1, min(fps or self.fps, self.fps))
+        return width, fps
+
+    def subscribe(self, stream_id: str, width: int = None, fps: int = None):
+        """
+        Returns: (key, PreviewChannel); pass key back to unsubscribe()
+        """
+        key = (stream_id, *self.rendition(width, fps))
+        channel = self.channels.get(key)
+        if channel is None or channel.ended:
+            channel = PreviewChannel(stream_id, key[1], self.quality, key[2])
+            self.channels[key] = channel
+        channel.subscribers += 1
+        if channel.task is None or channel.task.done():
+            channel.task = asyncio.create_task(channel._run())
+        return key, channel
+
+    def unsubscribe(self, key, channel):
+        channel.subscribers -= 1
+        if channel.subscribers <= 0 and self.channels.get(key) is channel:
+            # Last viewer of this rendition gone: the run loop exits and the
+            # cached frame is dropped with the channel
+            self.channels.pop(key, None)
+
+    def stats(self):
+        return [
+            {"stream_id": sid, "width": width, "fps": fps, "subscribers": ch.subscribers}
+            for (sid, width, fps), ch in self.channels.items()
+        ]
+
+preview_hub = PreviewHub(
+    max_width=settings.PREVIEW_MAX_WIDTH,
+    quality=settings.PREVIEW_JPEG_QUALITY,
+    fps=settings.PREVIEW_FPS
+)
@@ -0,0 +1,191 @@
+"""
+Incremental aggregation of detections, alerts and recognized actions.
+Counters are folded in Python per write batch and upserted additively into
+event_rollups, and the same counts are added to the per-stream daily
+Analytics rows. Dashboard queries read only rollups, so their cost does not
+depend on how many raw detections are retained. Minute rollups are pruned by
+the partition maintenance job after ROLLUP_MINUTE_RETENTION_HOURS.
+"""
+from collections import Counter
+from datetime import datetime, timedelta
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects.postgresql import insert
+from models.analytics import Analytics, EventRollup
+
+GRANULARITIES = ("minute", "hour", "day")
+ANALYTICS_COLUMNS = ("detection_counts", "alert_counts", "action_counts", "peak_hours")
+
+def truncate(ts: datetime, granularity: str) -> datetime:
+    if granularity == "minute":
+        return ts.replace(second=0, microsecond=0)
+    if granularity == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def _count(counter: Counter, stream_id, kind: str, label: str, ts: datetime, n: int = 1):
+    for granularity in GRANULARITIES:
+        counter[(stream_id, kind, label, granularity, truncate(ts, granularity))] += n
+
+def record_detections(db, rows):
+    """
+    Fold a batch of detection rows (as written by DetectionWriter) into the rollups.
+    Tracked objects count once, on their "start" row. Caller owns the transaction.
+    """
+    counter = Counter()
+    for row in rows:
+        if row.get("event") not in (None, "start"):
+            continue
+        _count(counter, row["stream_id"], "detection", row["object_class"], row["timestamp"])
+    _apply(db, counter)
+
+def record_alert(db, stream_id, alert_type: str, ts: datetime = None):
+    counter = Counter()
+    _count(counter, stream_id, "alert", alert_type, ts or datetime.now())
+    _apply(db, counter)
+
+def record_action(db, stream_id, action_type: str, ts: datetime = None):
+    counter = Counter()
+    _count(counter, stream_id, "action", action_type, ts or datetime.now())
+    _apply(db, counter)
+
+def _apply(db, counter: Counter):
+    if not counter:
+        return
+    values = [
+        {"stream_id": stream_id, "kind": kind, "label": label,
+         "granularity": granularity, "bucket": bucket, "count": n}
+        for (stream_id, kind, label, granularity, bucket), n in counter.items()
+    ]
+    stmt = insert(EventRollup.__table__).values(values)
+    stmt = stmt.on_conflict_do_update(
+        constraint="uix_rollup_key",
+        set_={"count": EventRollup.__table__.c.count + stmt.excluded.count}
+    )
+    db.execute(stmt)
+    _add_daily_analytics(db, counter)
+
+def _add_daily_analytics(db, counter: Counter):
+    """
+    Add a batch's hourly counts to the Analytics(stream_id, date) rows. Each
+    row is locked while it is merged so concurrent writers do not lose counts.
+    """
+    deltas = {}
+    for (stream_id, kind, label, granularity, bucket), n in counter.items():
+        if granularity != "hour":
+            continue
+        delta = deltas.setdefault((stream_id, bucket.date()), {col: Counter() for col in ANALYTICS_COLUMNS})
+        delta[f"{kind}_counts"][label] += n
+        if kind == "detection":
+            delta["peak_hours"][str(bucket.hour)] += n
+
+    table = Analytics.__table__
+    # Same lock order in every writer
+    for (stream_id, day), delta in sorted(deltas.items(), key=lambda item: (str(item[0][0]), item[0][1])):
+        db.execute(insert(table).values(
+            stream_id=stream_id, date=day, **{col: {} for col in ANALYTICS_COLUMNS}
+        ).on_conflict_do_nothing(constraint="uix_stream_date"))
+        row = db.execute(
+            select(*(table.c[col] for col in ANALYTICS_COLUMNS))
+            .where(table.c.stream_id == stream_id, table.c.date == day)
+            .with_for_update()
+        ).one()
+        db.execute(
+            table.update()
+            .where(table.c.stream_id == stream_id, table.c.date == day)
+            .values(**{col: dict(Counter(getattr(row, col) or {}) + delta[col]) for col in ANALYTICS_COLUMNS})
+        )
+
+def prune_minutes(db, before: datetime) -> int:
+    """
+    Delete minute rollups older than before. Caller owns the transaction.
+    """
+    return db.execute(
+        text("DELETE FROM event_rollups WHERE granularity = 'minute' AND bucket < :before"),
+        {"before": before}
+    ).rowcount
+
+def _refresh_daily_analytics(db, days):
+    """
+    Rebuild Analytics(stream_id, date) rows from the hourly rollups (backfill).
+    """
+    for stream_id, day in days:
+        start = datetime.combine(day, datetime.min.time())
+        hourly = db.query(EventRollup.kind, EventRollup.label, EventRollup.bucket, EventRollup.count)\
+            .filter(
+                EventRollup.stream_id == stream_id,
+                EventRollup.granularity == "hour",
+                EventRollup.bucket >= start,
+                EventRollup.bucket < start + timedelta(days=1),
+            ).all()
+
+        detection_counts, alert_counts, action_counts, peak_hours = Counter(), Counter(), Counter(), Counter()
+        for kind, label, bucket, n in hourly:
+            if kind == "detection":
+                detection_counts[label] += n
+                peak_hours[str(bucket.hour)] += n
+            elif kind == "alert":
+                alert_counts[label] += n
+            elif kind == "action":
+                action_counts[label] += n
+
+        stmt = insert(Analytics.__table__).values(
+            stream_id=stream_id,
+            date=day,
+            detection_counts=dict(detection_counts),
+            alert_counts=dict(alert_counts),
+            action_counts=dict(action_counts),
+            peak_hours=dict(peak_hours)
+        )
+        stmt = stmt.on_conflict_do_update(
+            constraint="uix_stream_date",
+            set_={
+                "detection_counts": stmt.excluded.detection_counts,
+                "alert_counts": stmt.excluded.alert_counts,
+                "action_counts": stmt.excluded.action_counts,
+                "peak_hours": stmt.excluded.peak_hours,
+            }
+        )
+        db.execute(stmt)
+
+def backfill(db):
+    """
+    Rebuild all rollups from the raw detections / alerts / actions tables.
+    Intended for one-off use after enabling rollups on an existing database.
+    """
+    db.execute(text("DELETE FROM event_rollups"))
+    for granularity in GRANULARITIES:
+        db.execute(text("""
+            INSERT INTO event_rollups (id, stream_id, kind, label, granularity, bucket, count)
+            SELECT gen_random_uuid(), stream_id, 'detection', object_class, :g, date_trunc(:g, timestamp), count(*)
+            FROM detections WHERE stream_id IS NOT NULL AND (event IS NULL OR event = 'start')
+            GROUP BY 2, 4, 6
+        """), {"g": granularity})
+        db.execute(text("""
+            INSERT INTO event_rollups (id, stream_id, kind, label, granularity, bucket, count)
+            SELECT gen_random_uuid(), stream_id, 'alert', alert_type, :g, date_trunc(:g, created_at), count(*)
+            FROM alerts WHERE stream_id IS NOT NULL
+            GROUP BY 2, 4, 6
+        """), {"g": granularity})
+        db.execute(text("""
+            INSERT INTO event_rollups (id, stream_id, kind, label, granularity, bucket, count)
+            SELECT gen_random_uuid(), stream_id, 'action', action_type, :g, date_trunc(:g, timestamp), count(*)
+            FROM actions WHERE stream_id IS NOT NULL
+            GROUP BY 2, 4, 6
+        """), {"g": granularity})
+
+    days = db.query(EventRollup.stream_id, func.date(EventRollup.bucket))\
+        .filter(EventRollup.granularity == "day").distinct().all()
+    _refresh_daily_analytics(db, set(days))
+
+if __name__ == "__main__":
+    from core.database import SessionLocal
+    db = SessionLocal()
+    try:
+        backfill(db)
+        db.commit()
+        print("[+] Rollups rebuilt from raw detections and alerts.")
+    except Exception as e:
+        db.rollback()
+        print(f"[-] Error: {e}")
+    finally:
+        db.close()
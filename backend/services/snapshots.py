@@ -0,0 +1,24 @@
+"""
+Alert snapshots: one full-resolution JPEG per alert, written under
+settings.SNAPSHOT_DIR and served from /snapshots (see main.py).
+"""
+import os
+import cv2
+from core.config import settings
+
+def save_snapshot(alert_id, frame, quality: int = None) -> str:
+    """
+    Returns: URL path of the written JPEG, or None on failure
+    """
+    filename = f"{alert_id}.jpg"
+    try:
+        ok, buffer = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), quality or settings.SNAPSHOT_JPEG_QUALITY])
+        if not ok:
+            return None
+        os.makedirs(settings.SNAPSHOT_DIR, exist_ok=True)
+        with open(os.path.join(settings.SNAPSHOT_DIR, filename), "wb") as f:
+            f.write(buffer)
+    except Exception as e:
+        print(f"[!] Alert snapshot failed: {e}")
+        return None
+    return f"/snapshots/{filename}"
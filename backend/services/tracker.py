@@ -0,0 +1,215 @@
+"""
+SORT-style multi-object tracking between the detector and persistence.
+Each track carries a constant-velocity Kalman filter over (cx, cy, area,
+aspect) in normalized frame coordinates; detections are assigned to the
+predicted boxes by IoU with the Hungarian algorithm, per class. Time is
+measured in wall-clock seconds (time.time()) rather than frames because
+sampling is adaptive.
+
+Only track lifecycle events are persisted:
+- "start"  once a track has been matched min_hits times
+- "update" at most every update_interval seconds while it stays visible
+- "end"    when it has not been matched for max_age seconds (last box)
+
+last_seen is always the time of the last real match (it is what the rows
+record). Motion-gated gaps only move the prediction clock, so the next
+forced or full detector pass can still end tracks whose object has left;
+only tracks outside the region the detector looked at have their aging
+clock (aged_from) held.
+"""
+import uuid
+from collections import deque
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+def iou_matrix(a, b):
+    """
+    Pairwise IoU of xyxy boxes a [N, 4] and b [M, 4] -> [N, M]
+    """
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), dtype=np.float32)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+def box_to_z(box):
+    x1, y1, x2, y2 = box
+    w, h = max(x2 - x1, 1e-6), max(y2 - y1, 1e-6)
+    return np.array([x1 + w / 2, y1 + h / 2, w * h, w / h], dtype=np.float64)
+
+def x_to_box(x):
+    area, ratio = max(x[2], 1e-12), max(x[3], 1e-6)
+    w = np.sqrt(area * ratio)
+    h = area / w
+    return np.array([x[0] - w / 2, x[1] - h / 2, x[0] + w / 2, x[1] + h / 2], dtype=np.float32)
+
+class KalmanBoxTrack:
+    """
+    State: [cx, cy, s, r, vcx, vcy, vs], velocities per second.
+    """
+    H = np.eye(4, 7)
+    R = np.diag([1e-4, 1e-4, 1e-3, 1e-2])
+
+    def __init__(self, box, confidence, class_id, now, frame_number=None):
+        self.id = uuid.uuid4()
+        self.class_id = int(class_id)
+        self.x = np.zeros(7)
+        self.x[:4] = box_to_z(box)
+        self.P = np.diag([1e-3, 1e-3, 1e-3, 1e-2, 1e-1, 1e-1, 1e-2])
+
+        self.box = np.asarray(box, dtype=np.float32)
+        self.confidence = float(confidence)
+        self.hits = 1
+        self.confirmed = False
+        self.started_at = now
+        self.last_seen = now # last real match
+        self.aged_from = now # absence counts from here (see ObjectTracker._expire)
+        self.last_predict = now
+        self.last_persisted = None
+        self.frame_number = frame_number
+        self.row_ids = deque(maxlen=16) # ids of the newest persisted detection rows
+
+    def predict(self, now):
+        dt = max(0.0, now - self.last_predict)
+        self.last_predict = now
+        if dt == 0:
+            return x_to_box(self.x)
+        F = np.eye(7)
+        F[0, 4] = F[1, 5] = F[2, 6] = dt
+        Q = np.diag([1e-4, 1e-4, 1e-4, 1e-5, 1e-3, 1e-3, 1e-4]) * max(dt, 1e-3)
+        if self.x[2] + self.x[6] * dt <= 0:
+            self.x[6] = 0.0
+        self.x = F @ self.x
+        self.P = F @ self.P @ F.T + Q
+        return x_to_box(self.x)
+
+    def update(self, box, confidence, now, frame_number=None):
+        y = box_to_z(box) - self.H @ self.x
+        S = self.H @ self.P @ self.H.T + self.R
+        K = self.P @ self.H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ y
+        self.P = (np.eye(7) - K @ self.H) @ self.P
+
+        self.box = np.asarray(box, dtype=np.float32)
+        self.confidence = float(confidence)
+        self.hits += 1
+        self.last_seen = now
+        self.aged_from = now
+        self.frame_number = frame_number
+
+class ObjectTracker:
+    def __init__(self, names, iou_threshold=0.3, min_hits=2, max_age=5.0, update_interval=30.0):
+        self.names = names
+        self.iou_threshold = iou_threshold
+        self.min_hits = min_hits
+        self.max_age = max_age
+        self.update_interval = update_interval
+        self.tracks = []
+
+        self.detections_seen = 0
+        self.events_emitted = 0
+        self.tracks_started = 0
+
+    def _event(self, kind, track, now):
+        track.last_persisted = now
+        self.events_emitted += 1
+        return (kind, track)
+
+    def _match(self, predicted, detections):
+        """
+        Returns: list of (track_index, detection_index) pairs
+        """
+        if not self.tracks or len(detections) == 0:
+            return []
+        iou = iou_matrix(predicted, detections.boxes)
+        # Never match across classes
+        track_classes = np.array([t.class_id for t in self.tracks])
+        iou[track_classes[:, None] != detections.class_ids[None, :]] = 0.0
+        rows, cols = linear_sum_assignment(-iou)
+        return [(r, c) for r, c in zip(rows, cols) if iou[r, c] >= self.iou_threshold]
+
+    def update(self, detections, now, frame_number=None, region=None):
+        """
+        Feed one inference result. region is the normalized xyxy area the
+        detector actually looked at (None = whole frame); tracks outside it
+        are held rather than aged.
+        Returns: list of (event, track) to persist, event in {"start", "update", "end"}
+        """
+        self.detections_seen += len(detections)
+        predicted = np.array([t.predict(now) for t in self.tracks], dtype=np.float32).reshape(-1, 4)
+        matches = self._match(predicted, detections)
+
+        events = []
+        matched_detections, matched_tracks = set(), set()
+        for ti, di in matches:
+            track = self.tracks[ti]
+            track.update(detections.boxes[di], detections.confidence[di], now, frame_number)
+            matched_detections.add(di)
+            matched_tracks.add(ti)
+            if not track.confirmed and track.hits >= self.min_hits:
+                track.confirmed = True
+                self.tracks_started += 1
+                events.append(self._event("start", track, now))
+            elif track.confirmed and now - track.last_persisted >= self.update_interval:
+                events.append(self._event("update", track, now))
+
+        if region is not None:
+            x1, y1, x2, y2 = region
+            for ti, track in enumerate(self.tracks):
+                cx, cy = (track.box[0] + track.box[2]) / 2, (track.box[1] + track.box[3]) / 2
+                if ti not in matched_tracks and not (x1 <= cx <= x2 and y1 <= cy <= y2):
+                    track.aged_from = now # not looked at, not missed
+
+        for di in range(len(detections)):
+            if di not in matched_detections:
+                track = KalmanBoxTrack(
+                    detections.boxes[di], detections.confidence[di], detections.class_ids[di], now, frame_number
+                )
+                self.tracks.append(track)
+                if self.min_hits <= 1:
+                    track.confirmed = True
+                    self.tracks_started += 1
+                    events.append(self._event("start", track, now))
+
+        events.extend(self._expire(now))
+        return events
+
+    def hold(self, now):
+        """
+        The detector was skipped because nothing moved: boxes are not
+        extrapolated across the gap. last_seen and the aging clock are left
+        alone, so the next detector pass that misses a track can end it.
+        """
+        for track in self.tracks:
+            track.last_predict = now
+
+    def _expire(self, now):
+        events, alive = [], []
+        for track in self.tracks:
+            if now - track.aged_from <= self.max_age:
+                alive.append(track)
+            elif track.confirmed:
+                events.append(self._event("end", track, now))
+        self.tracks = alive
+        return events
+
+    def close(self, now):
+        """
+        End every open track (stream stopping).
+        """
+        events = [self._event("end", t, now) for t in self.tracks if t.confirmed]
+        self.tracks = []
+        return events
+
+    def stats(self):
+        return {
+            "active_tracks": sum(1 for t in self.tracks if t.confirmed),
+            "tracks_started": self.tracks_started,
+            "track_events": self.events_emitted,
+            "track_write_ratio": round(self.events_emitted / self.detections_seen, 3) if self.detections_seen else 0.0,
+        }
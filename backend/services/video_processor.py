@@ -1,19 +1,138 @@
-from services.yolo_detector import YoloDetector
-import cv2
+from services.yolo_detector import Detections
+from services.model_registry import models
+from services.detection_writer import DetectionWriter
+from core.config import settings
 import time
 import asyncio
 from core.database import SessionLocal
 from models.stream import Stream
-from models.detection import Detection
 from models.alert import Alert
+from models.action import Action
+from services import rollups
+from services.frame_bus import frame_bus
+from services.control_channel import control_channel, ControlState
+from services.frame_scheduler import AdaptiveFrameScheduler, detection_budget
+from services.motion_gate import MotionGate
+from services.cropping import union_region, expand_region, region_area, crop_for_inference
+from services.zones import ZoneFilter
+from services.capture import FrameReader
+from services.snapshots import save_snapshot
+from services.tracker import ObjectTracker
+from services.action_pipeline import ActionCascade
+from services.alert_suppression import create_suppressor
+from services.event_hub import publish_event, track_messages, snapshot_message, alert_message, action_message
+from sqlalchemy import func
 from datetime import datetime, timedelta
-from uuid import UUID
+from uuid import UUID, uuid4
 
-# Global instances to avoid reloading models on every call
-yolo = YoloDetector()
+# Detector and batching scheduler come from the model registry and load on
+# first use, so importing this module (API process, health checks) stays cheap
 
-# Buffer for live frames {stream_id: frame_bytes}
-latest_frames = {}
+# Stop signals and settings pushed over the control channel (no DB polling)
+control = ControlState(control_channel)
+
+# Bulk write-behind for detections, decoupled from the capture loop
+writer = DetectionWriter(
+    max_buffer=settings.DETECTION_WRITER_MAX_BUFFER,
+    batch_size=settings.DETECTION_WRITER_BATCH_SIZE,
+    flush_interval_ms=settings.DETECTION_WRITER_FLUSH_MS
+)
+
+# Per-stream sampling state, exposed for inspection {stream_id: AdaptiveFrameScheduler}
+frame_schedulers = {}
+
+# Per-stream motion gates, exposed for skip-ratio reporting {stream_id: MotionGate}
+motion_gates = {}
+
+# Per-stream capture readers {stream_id: FrameReader}
+capture_readers = {}
+
+# Per-stream object trackers {stream_id: ObjectTracker}
+trackers = {}
+
+# Per-stream person-triggered action recognition {stream_id: ActionCascade}
+action_cascades = {}
+
+# Alert cooldowns keyed by (stream_id, alert_type), decided without a DB query
+alert_suppressor = create_suppressor(settings.ALERT_SUPPRESSION_BACKEND)
+
+async def detect_frame(stream_id: str, frame, gate, zones=None):
+    """
+    Motion-gated, zone-aware detector call.
+    Returns: (detections or None if skipped, whether motion was seen,
+    normalized region the detector looked at or None for the whole frame)
+    """
+    run, regions = gate.check(frame) if gate is not None else (True, None)
+    if not run:
+        return None, False, None
+    scheduler = models.get("detection_scheduler")
+    covered = None
+
+    if zones and zones.tiles:
+        # Small configured zones: infer only on their rectangles
+        crops = [crop_for_inference(frame, tile) for tile in zones.tiles]
+        results = await asyncio.gather(*[
+            scheduler.detect(stream_id, crop, imgsz) for crop, _, imgsz in crops
+        ])
+        detections = Detections.concat(
+            [result.remap(*transform) for result, (_, transform, _) in zip(results, crops)], scheduler.detector.names
+        )
+    else:
+        # Restrict inference to the changed area when it is small enough
+        region = union_region(regions)
+        if region is not None and region_area(expand_region(region)) <= settings.MOTION_CROP_MAX_AREA:
+            covered = expand_region(region)
+            crop, transform, imgsz = crop_for_inference(frame, covered)
+            detections = (await scheduler.detect(stream_id, crop, imgsz)).remap(*transform)
+        else:
+            detections = await scheduler.detect(stream_id, frame)
+
+    if zones:
+        detections = zones.filter(detections)
+    return detections, bool(regions), covered
+
+async def run_db(fn, *args):
+    """
+    Run a blocking Session call in the default executor. Every stream of a
+    worker shares its event loop, so a slow database must not stall them.
+    If the stream is cancelled meanwhile, the call still finishes before the
+    caller's cleanup touches the session.
+    """
+    future = asyncio.get_running_loop().run_in_executor(None, fn, *args)
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        await asyncio.wait([future])
+        raise
+
+def _load_stream(db, stream_id: str):
+    return db.query(Stream).filter(Stream.id == stream_id).first()
+
+def _set_status(db, stream, status: str):
+    stream.status = status
+    db.commit()
+
+def _load_startup_state(db, stream_id: str):
+    """
+    Returns: (neural_engine settings or None, [(alert_type, last created_at)])
+    """
+    from models.setting import SystemSetting
+    setting = db.query(SystemSetting).filter(SystemSetting.category == 'neural_engine').first()
+    recent_alerts = db.query(Alert.alert_type, func.max(Alert.created_at))\
+        .filter(Alert.stream_id == UUID(stream_id), Alert.created_at >= datetime.now() - timedelta(seconds=settings.ALERT_SUPPRESSION_TTL))\
+        .group_by(Alert.alert_type).all()
+    return (setting.settings if setting else None), recent_alerts
+
+def _save_actions(db, actions):
+    for action in actions:
+        db.add(action)
+        rollups.record_action(db, action.stream_id, action.action_type, action.timestamp)
+    db.commit()
+
+def _save_alert(db, alert):
+    db.add(alert)
+    rollups.record_alert(db, alert.stream_id, alert.alert_type)
+    db.commit()
 
 async def process_stream(stream_id: str):
     """
@@ -21,120 +140,222 @@ async def process_stream(stream_id: str):
     """
     db = SessionLocal()
     try:
+        # Zone updates from before this read are already in the row
+        control.take_updates(stream_id)
         # Initial fetch of stream
-        stream = db.query(Stream).filter(Stream.id == stream_id).first()
+        stream = await run_db(_load_stream, db, stream_id)
         if not stream or not stream.url:
             print(f"[-] Stream {stream_id} not found or no URL")
             return
 
+        # Clear a stale stop flag before connecting, so a stop that arrives
+        # while the source opens is still honoured
+        control.stopped.discard(stream_id)
         print(f"[*] AI attempting to connect to: {stream.name} (Source: {stream.url})")
 
-        # Initialize video capture
-        video_source = stream.url
-        if video_source.isdigit():
-            video_source = int(video_source)
-            
-        print(f"[*] Attempting connection to device {video_source}...")
-        
-        # Use a separate thread for blocking OpenCV calls
-        loop = asyncio.get_event_loop()
-        
-        # Try different backends on Windows for better compatibility with index 0
-        cap = await loop.run_in_executor(None, lambda: cv2.VideoCapture(video_source, cv2.CAP_DSHOW))
-        if not cap.isOpened():
-            cap = await loop.run_in_executor(None, lambda: cv2.VideoCapture(video_source, cv2.CAP_MSMF))
-        if not cap.isOpened():
-            cap = await loop.run_in_executor(None, lambda: cv2.VideoCapture(video_source))
-        
-        if not cap.isOpened():
+        # Dedicated reader thread per stream; live sources keep only the newest frame.
+        # In "inference" mode frames are decoded at the detector's resolution and
+        # that one buffer feeds detector, motion gate and preview; the native
+        # frame is only converted for alert snapshots.
+        inference_mode = settings.CAPTURE_MODE == "inference"
+        reader = FrameReader(
+            stream.url,
+            backend=settings.CAPTURE_BACKEND,
+            max_width=settings.CAPTURE_INFERENCE_WIDTH if inference_mode else settings.CAPTURE_MAX_WIDTH,
+            decode_mode=settings.CAPTURE_DECODE_MODE,
+            max_backoff=settings.CAPTURE_RECONNECT_MAX_BACKOFF,
+            reconnect_timeout=settings.CAPTURE_RECONNECT_TIMEOUT,
+            keep_full=inference_mode
+        ).start(asyncio.get_running_loop())
+        capture_readers[stream_id] = reader
+        print(f"[*] Attempting connection to {stream.url} ({settings.CAPTURE_BACKEND})...")
+        # The first stream in this process loads the detector, off the event
+        # loop and while the reader connects
+        scheduler = await asyncio.get_running_loop().run_in_executor(None, models.get, "detection_scheduler")
+        yolo = scheduler.detector
+        pending = await reader.read_async(timeout=settings.CAPTURE_OPEN_TIMEOUT)
+        if control.should_stop(stream_id):
+            print(f"[*] STOP SIGNAL RECEIVED while connecting: {stream.name}")
+            return
+
+        if pending is None:
             print(f"[!] FAILED to open stream: {stream.name}. Check source availability.")
-            stream.status = "error"
-            db.commit()
+            await run_db(_set_status, db, stream, "error")
             return
 
-        # Fetch threshold
-        from models.setting import SystemSetting
-        setting = db.query(SystemSetting).filter(SystemSetting.category == 'neural_engine').first()
-        threshold = 0.5
-        if setting and "threshold" in setting.settings:
-            threshold = float(setting.settings["threshold"])
+        # Fetch threshold and the latest alert per type
+        engine_settings, recent_alerts = await run_db(_load_startup_state, db, stream_id)
+        if engine_settings:
+            control.settings['neural_engine'] = engine_settings
+
+        # Alert cooldowns follow the stream's preset; seed them from the last
+        # persisted alert so a restart does not re-fire immediately
+        alert_suppressor.configure(stream_id, stream.config_preset)
+        for alert_type, created_at in recent_alerts:
+            alert_suppressor.prime(stream_id, alert_type, created_at.timestamp())
 
         print(f"[+] CONNECTION ESTABLISHED: {stream.name}. Neural Engine Online.")
         
-        stream.status = "active"
-        db.commit()
+        await run_db(_set_status, db, stream, "active")
         
         frame_count = 0
+        held = None # FrameBuffer of the frame being processed
+        sampler = AdaptiveFrameScheduler(
+            max_fps=settings.INFERENCE_MAX_FPS,
+            idle_fps=settings.INFERENCE_IDLE_FPS,
+            hold_seconds=settings.INFERENCE_ACTIVITY_HOLD
+        )
+        frame_schedulers[stream_id] = sampler
+        detection_budget.register(stream_id, sampler)
+        gate = None
+        if settings.MOTION_GATE_ENABLED:
+            gate = MotionGate(
+                width=settings.MOTION_GATE_WIDTH,
+                pixel_threshold=settings.MOTION_PIXEL_THRESHOLD,
+                min_area=settings.MOTION_MIN_AREA,
+                force_interval=settings.MOTION_FORCE_INTERVAL
+            )
+            motion_gates[stream_id] = gate
+        tracker = None
+        if settings.TRACKER_ENABLED:
+            tracker = ObjectTracker(
+                yolo.names,
+                iou_threshold=settings.TRACKER_IOU_THRESHOLD,
+                min_hits=settings.TRACKER_MIN_HITS,
+                max_age=settings.TRACKER_MAX_AGE,
+                update_interval=settings.TRACKER_UPDATE_INTERVAL
+            )
+            trackers[stream_id] = tracker
+        cascade = None
+        if settings.ACTION_RECOGNITION_ENABLED and tracker is not None:
+            cascade = ActionCascade(
+                stream_id,
+                yolo.names,
+                max_tracks=settings.ACTION_MAX_TRACKS,
+                interval=settings.ACTION_INTERVAL,
+                min_confidence=settings.ACTION_MIN_CONFIDENCE,
+                frame_stride=settings.ACTION_FRAME_STRIDE
+            )
+            action_cascades[stream_id] = cascade
+        zones = ZoneFilter(stream.detection_zones, crop_max_area=settings.ZONE_CROP_MAX_AREA)
         
         while True:
-            # Check for stop signal or settings update every 60 frames
-            if frame_count % 60 == 0:
-                db.refresh(stream)
-                if stream.status != "active":
-                    print(f"[*] STOP SIGNAL RECEIVED: {stream.name}")
-                    break
-                
-                setting = db.query(SystemSetting).filter(SystemSetting.category == 'neural_engine').first()
-                if setting and "threshold" in setting.settings:
-                    threshold = float(setting.settings["threshold"])
+            # Stop signal and threshold updates arrive via the control channel
+            if control.should_stop(stream_id):
+                print(f"[*] STOP SIGNAL RECEIVED: {stream.name}")
+                break
+            threshold = float(control.get('neural_engine', 'threshold', 0.5))
+            updates = control.take_updates(stream_id)
+            if "detection_zones" in updates:
+                # Rebuilt for the current frame size below; the gate drops its zone mask
+                zones = ZoneFilter(updates["detection_zones"], crop_max_area=settings.ZONE_CROP_MAX_AREA)
+                if gate is not None:
+                    gate.set_zones(None)
+                print(f"[*] Detection zones updated: {stream.name}")
+            if "config_preset" in updates:
+                # New cooldown windows; windows already running are kept
+                alert_suppressor.configure(stream_id, updates["config_preset"])
+                print(f"[*] Preset switched to {updates['config_preset']}: {stream.name}")
             
-            # Non-blocking read (wrapped in executor)
-            ret, frame = await loop.run_in_executor(None, cap.read)
-            if not ret:
+            # Previous frame's pooled buffer goes back to the reader
+            if held is not None:
+                held.release()
+                held = None
+
+            # Newest decoded frame; awaiting it does not occupy an executor thread
+            if pending is not None:
+                held, pending = pending, None
+            else:
+                held = await reader.read_async(timeout=settings.CAPTURE_READ_TIMEOUT)
+            if held is None:
+                if not reader.failed:
+                    continue # stalled or reconnecting; re-check the stop signal
                 print(f"[!] CONNECTION LOST: {stream.name}")
-                stream.status = "error"
-                db.commit()
+                await run_db(_set_status, db, stream, "error")
                 break
+            frame = held.array
             
-            # Encode for live preview
-            _, buffer = cv2.imencode('.jpg', frame)
-            latest_frames[stream_id] = buffer.tobytes()
+            # Publish the raw frame for live preview only while someone is reading;
+            # JPEG encoding happens on demand in the consumer (services/preview.py)
+            if frame_bus.wanted(stream_id, settings.PREVIEW_IDLE_TIMEOUT):
+                frame_bus.publish(stream_id, frame)
                 
             frame_count += 1
-            
+            if zones and zones.polygons is None:
+                # Zone points are drawn on the native resolution, not the decoded size
+                zones.prepare(*(reader.source_size or (frame.shape[1], frame.shape[0])))
+                if gate is not None:
+                    gate.set_zones(zones.polygons)
+
+            # Action clips follow confirmed person tracks on every decoded frame
+            # (SlowFast needs dense frames); nothing runs while nobody is tracked
+            if cascade is not None:
+                actions, messages = [], []
+                for track, result, duration_ms in cascade.step(frame, tracker.tracks, time.time()):
+                    action = Action(
+                        id=uuid4(),
+                        stream_id=UUID(stream_id),
+                        timestamp=datetime.now(),
+                        action_type=result["action"],
+                        confidence=result["confidence"],
+                        duration_ms=duration_ms,
+                        related_detection_ids=[str(i) for i in track.row_ids]
+                    )
+                    actions.append(action)
+                    messages.append(action_message(stream_id, action, track))
+                if actions:
+                    await run_db(_save_actions, db, actions)
+                    for message in messages:
+                        publish_event(message)
+
             # AI Inference
-            if frame_count % 5 == 0: # Every 5th frame for stability
-                detections = yolo.detect(frame)
-                h, w = frame.shape[:2]
-                for det in detections:
-                    if det["confidence"] > threshold:
-                        # Normalize coordinates for frontend
-                        normalized_bbox = {
-                            "x1": det["bbox"]["x1"] / w,
-                            "y1": det["bbox"]["y1"] / h,
-                            "x2": det["bbox"]["x2"] / w,
-                            "y2": det["bbox"]["y2"] / h
-                        }
-                        
-                        new_det = Detection(
-                            stream_id=UUID(stream_id),
-                            timestamp=datetime.now(),
-                            object_class=det["class"],
-                            confidence=det["confidence"],
-                            bbox_json=normalized_bbox
-                        )
-                        db.add(new_det)
-                        print(f"  [BRAIN] Identified {det['class']} ({det['confidence']:.2f}) on {stream.name}")
-                        
-                        if det["class"] == "person" and det["confidence"] > 0.7:
-                            last_alert = db.query(Alert).filter(
-                                Alert.stream_id == UUID(stream_id),
-                                Alert.alert_type == "Unauthorized Person",
-                                Alert.created_at >= datetime.now() - timedelta(seconds=30)
-                            ).first()
-                            
-                            if not last_alert:
-                                new_alert = Alert(
-                                    stream_id=UUID(stream_id),
-                                    alert_type="Unauthorized Person",
-                                    severity="high",
-                                    description=f"Neural pattern match: Human presence on {stream.name}.",
-                                    resolved=False
-                                )
-                                db.add(new_alert)
-                                print(f"  [ALERT] Security breach logged for {stream.name}")
-                
-                db.commit()
+            # Adaptive sampling: rate follows scene activity and node latency
+            if sampler.should_infer():
+                started = time.monotonic()
+                detections, moved, covered = await detect_frame(stream_id, frame, gate, zones)
+                if detections is None:
+                    # Static scene: the motion gate skipped the detector
+                    sampler.record(None, active=False)
+                    if tracker is not None:
+                        tracker.hold(time.time())
+                    await asyncio.sleep(0.001)
+                    continue
+                detections = detections.filter(threshold)
+                sampler.record(time.monotonic() - started, active=moved or len(detections) > 0)
+                now = datetime.now()
+                if tracker is not None:
+                    # Persist track lifecycle events only, not every box of every frame
+                    events = tracker.update(detections, time.time(), frame_count, covered)
+                    writer.enqueue_track_events(stream_id, events, yolo.names)
+                    for message in track_messages(stream_id, events, yolo.names, now):
+                        publish_event(message)
+                elif len(detections) > 0:
+                    writer.enqueue_detections(stream_id, detections, now, frame_count)
+                    publish_event(snapshot_message(stream_id, detections, now))
+                if len(detections) > 0:
+                    print(f"  [BRAIN] Identified {len(detections)} objects ({', '.join(sorted(set(detections.class_names)))}) on {stream.name}")
+
+                # Alert check on the person subset, once per frame instead of per box;
+                # the cooldown is decided locally and only new alerts hit the DB
+                if len(detections.filter(0.7, classes={"person"})) > 0 \
+                        and alert_suppressor.should_fire(stream_id, "Unauthorized Person"):
+                    new_alert = Alert(
+                        id=uuid4(),
+                        stream_id=UUID(stream_id),
+                        alert_type="Unauthorized Person",
+                        severity="high",
+                        description=f"Neural pattern match: Human presence on {stream.name}.",
+                        resolved=False
+                    )
+                    # Full resolution is materialized only here
+                    new_alert.thumbnail_url = await asyncio.get_running_loop().run_in_executor(
+                        None, lambda: save_snapshot(new_alert.id, reader.full_frame(held))
+                    )
+                    message = alert_message(stream_id, new_alert, now)
+                    # The rollup upsert locks the day's analytics row; keep it off the loop
+                    await run_db(_save_alert, db, new_alert)
+                    publish_event(message)
+                    print(f"  [ALERT] Security breach logged for {stream.name}")
                 
             await asyncio.sleep(0.001)
             
@@ -143,7 +364,23 @@ async def process_stream(stream_id: str):
         print(f"[EX] CRITICAL FAILURE for {stream_id}:")
         traceback.print_exc()
     finally:
-        if 'cap' in locals() and cap.isOpened():
-            cap.release()
-        latest_frames.pop(stream_id, None)
-        db.close()
+        if 'held' in locals() and held is not None:
+            held.release()
+        if 'pending' in locals() and pending is not None:
+            pending.release()
+        if 'reader' in locals():
+            reader.close()
+        capture_readers.pop(stream_id, None)
+        frame_bus.close(stream_id)
+        if 'tracker' in locals() and tracker is not None:
+            events = tracker.close(time.time())
+            writer.enqueue_track_events(stream_id, events, tracker.names)
+            for message in track_messages(stream_id, events, tracker.names, datetime.now()):
+                publish_event(message)
+        trackers.pop(stream_id, None)
+        action_cascades.pop(stream_id, None)
+        alert_suppressor.release(stream_id)
+        frame_schedulers.pop(stream_id, None)
+        detection_budget.release(stream_id)
+        motion_gates.pop(stream_id, None)
+        await run_db(db.close)
@@ -0,0 +1,221 @@
+"""
+Process-based stream workers.
+Streams are sharded across a fixed pool of worker processes; each worker
+runs its shard's process_stream coroutines (capture, decode, detection) on
+its own event loop and GIL. The orchestrator assigns streams to the least
+loaded worker, restarts workers that die or stop sending heartbeats and
+reassigns their streams, and moves streams off overloaded workers when the
+shard sizes drift apart. A moved stream starts on its new worker only after
+the old one reports it finished, so local devices are released first.
+"""
+import asyncio
+import multiprocessing as mp
+import queue
+import time
+
+HEARTBEAT_INTERVAL = 1.0
+HEARTBEAT_TIMEOUT = 60.0 # generous: the first heartbeat follows the model imports
+MOVE_TIMEOUT = 30.0
+
+def worker_main(worker_id: int, commands, events):
+    from services.cpu_budget import cpu_budget
+    # This worker's cores and thread pools, before any model is loaded
+    cpu_budget.configure(worker_id)
+    asyncio.run(_worker_loop(worker_id, commands, events))
+
+async def _worker_loop(worker_id: int, commands, events):
+    # Imported here so models load inside the worker, not the orchestrator
+    from services.video_processor import process_stream, writer
+    from services.cpu_budget import cpu_budget
+
+    loop = asyncio.get_running_loop()
+    tasks = {} # stream_id -> Task
+    last_heartbeat = 0.0
+    print(f"[+] Stream worker {worker_id} online")
+
+    while True:
+        try:
+            cmd, stream_id = await loop.run_in_executor(None, commands.get, True, 0.5)
+        except queue.Empty:
+            cmd, stream_id = None, None
+
+        if cmd == "start" and stream_id not in tasks:
+            tasks[stream_id] = asyncio.create_task(process_stream(stream_id))
+        elif cmd == "stop" and stream_id in tasks:
+            # Reported as finished below once the capture is closed
+            tasks[stream_id].cancel()
+        elif cmd == "shutdown":
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            writer.close()
+            return
+
+        # Streams that ended on their own (stop signal, lost connection)
+        for sid, task in list(tasks.items()):
+            if task.done():
+                del tasks[sid]
+                events.put(("finished", worker_id, sid))
+
+        if time.monotonic() - last_heartbeat >= HEARTBEAT_INTERVAL:
+            cpu_budget.set_streams(len(tasks))
+            events.put(("heartbeat", worker_id, sorted(tasks)))
+            events.put(("budget", worker_id, cpu_budget.stats()))
+            last_heartbeat = time.monotonic()
+
+class WorkerPool:
+    def __init__(self, size: int):
+        self.size = max(1, size)
+        self.ctx = mp.get_context("spawn")
+        self.events = self.ctx.Queue()
+        self.workers = {} # worker_id -> {"process", "commands", "streams": set()}
+        self.assignments = {} # stream_id -> worker_id
+        self.moving = {} # stream_id -> (from worker_id, to worker_id, started)
+        for worker_id in range(self.size):
+            self._spawn(worker_id)
+
+    def _spawn(self, worker_id: int):
+        commands = self.ctx.Queue()
+        process = self.ctx.Process(
+            target=worker_main,
+            args=(worker_id, commands, self.events),
+            name=f"stream-worker-{worker_id}",
+            daemon=True
+        )
+        process.start()
+        self.workers[worker_id] = {"process": process, "commands": commands, "streams": set(),
+                                   "last_seen": time.monotonic()}
+
+    def _drain_events(self):
+        while True:
+            try:
+                kind, worker_id, payload = self.events.get_nowait()
+            except queue.Empty:
+                return
+            worker = self.workers.get(worker_id)
+            if worker is None:
+                continue
+            worker["last_seen"] = time.monotonic()
+            if kind == "heartbeat":
+                worker["running"] = payload
+            elif kind == "budget":
+                worker["cpu"] = payload
+            elif kind == "finished":
+                if self.assignments.get(payload) == worker_id:
+                    del self.assignments[payload]
+                    worker["streams"].discard(payload)
+                move = self.moving.get(payload)
+                if move and move[0] == worker_id:
+                    # Old worker released the source: start it on the new one
+                    del self.moving[payload]
+                    if move[1] in self.workers and self.workers[move[1]]["process"].is_alive():
+                        self._assign(payload, move[1])
+
+    def _reap_dead(self):
+        """
+        Respawn dead workers. Returns: streams that were running on them
+        """
+        orphans = []
+        now = time.monotonic()
+        for worker_id, worker in list(self.workers.items()):
+            if worker["process"].is_alive():
+                if now - worker["last_seen"] < HEARTBEAT_TIMEOUT:
+                    continue
+                print(f"[!] Stream worker {worker_id} sent no heartbeat for {now - worker['last_seen']:.0f}s; restarting")
+                worker["process"].terminate()
+                worker["process"].join(timeout=5)
+            else:
+                print(f"[!] Stream worker {worker_id} died (exit {worker['process'].exitcode}); "
+                      f"reassigning {len(worker['streams'])} streams")
+            for stream_id in worker["streams"]:
+                self.assignments.pop(stream_id, None)
+                orphans.append(stream_id)
+            # A move away from this worker will never report finished
+            for stream_id, move in list(self.moving.items()):
+                if move[0] == worker_id:
+                    del self.moving[stream_id]
+                    orphans.append(stream_id)
+            self._spawn(worker_id)
+        return orphans
+
+    def _least_loaded(self):
+        return min(self.workers, key=lambda wid: len(self.workers[wid]["streams"]))
+
+    def _assign(self, stream_id: str, worker_id: int):
+        self.workers[worker_id]["commands"].put(("start", stream_id))
+        self.workers[worker_id]["streams"].add(stream_id)
+        self.assignments[stream_id] = worker_id
+
+    def _unassign(self, stream_id: str):
+        worker_id = self.assignments.pop(stream_id)
+        self.workers[worker_id]["commands"].put(("stop", stream_id))
+        self.workers[worker_id]["streams"].discard(stream_id)
+
+    def _rebalance(self):
+        # One move at a time so a rebalance never restarts many captures at once
+        now = time.monotonic()
+        for stream_id, move in list(self.moving.items()):
+            if now - move[2] >= MOVE_TIMEOUT:
+                print(f"[!] Stream {stream_id} did not finish on worker {move[0]}; assigning normally")
+                del self.moving[stream_id]
+        if self.moving:
+            return
+
+        loads = {wid: len(w["streams"]) for wid, w in self.workers.items()}
+        busiest = max(loads, key=loads.get)
+        idlest = min(loads, key=loads.get)
+        if loads[busiest] - loads[idlest] > 1:
+            stream_id = next(iter(self.workers[busiest]["streams"]))
+            print(f"[*] Rebalancing stream {stream_id}: worker {busiest} -> {idlest}")
+            # Stop first; _drain_events starts it on idlest once it is finished
+            self._unassign(stream_id)
+            self.moving[stream_id] = (busiest, idlest, now)
+
+    def check(self):
+        """
+        Worker health pass between reconciles: respawn dead or silent workers
+        and move their streams to the surviving ones.
+        """
+        self._drain_events()
+        for stream_id in self._reap_dead():
+            self._assign(stream_id, self._least_loaded())
+
+    def sync(self, active_ids):
+        """
+        Reconcile assignments with the set of streams that should be running.
+        """
+        self._drain_events()
+        self._reap_dead()
+
+        for stream_id in list(self.assignments):
+            if stream_id not in active_ids:
+                self._unassign(stream_id)
+        for stream_id in list(self.moving):
+            if stream_id not in active_ids:
+                del self.moving[stream_id]
+
+        for stream_id in active_ids:
+            if stream_id not in self.assignments and stream_id not in self.moving:
+                worker_id = self._least_loaded()
+                print(f"[+] Assigning stream {stream_id} to worker {worker_id}")
+                self._assign(stream_id, worker_id)
+
+        self._rebalance()
+
+    def shutdown(self):
+        for worker in self.workers.values():
+            worker["commands"].put(("shutdown", None))
+        for worker in self.workers.values():
+            worker["process"].join(timeout=5)
+
+    def stats(self):
+        return {
+            wid: {
+                "alive": w["process"].is_alive(),
+                "streams": sorted(w["streams"]),
+                "running": w.get("running", []),
+                "heartbeat_age_s": round(time.monotonic() - w["last_seen"], 1),
+                "cpu": w.get("cpu"),
+            }
+            for wid, w in self.workers.items()
+        }
@@ -1,39 +1,320 @@
-from ultralytics import YOLO
-import torch
+"""
+YOLOv8 object detection with interchangeable inference backends
+(settings.DETECTOR_BACKEND):
+    ultralytics - the PyTorch model through Ultralytics (default, uses CUDA when present)
+    onnxruntime - the same model exported to ONNX, run by ONNX Runtime with
+                  explicit thread counts and optional INT8 weights
+    openvino    - the ONNX model on ONNX Runtime's OpenVINO execution provider
+The exported path reproduces Ultralytics' letterboxing, NMS and box scaling,
+so both produce the same Detections; check_detector_parity.py verifies it.
+"""
+import ast
+import os
+import cv2
 import numpy as np
+from core.config import settings
 
-class YoloDetector:
-    def __init__(self, model_path='yolov8n.pt'):
-        # Check for GPU
+CONF_THRESHOLD = 0.25 # Ultralytics predict() defaults
+IOU_THRESHOLD = 0.7
+MAX_DET = 300
+MAX_NMS = 30000
+MAX_WH = 7680 # class offset for batched NMS
+STRIDE = 32
+
+class Detections:
+    """
+    Columnar (struct-of-arrays) detections for a single frame.
+    boxes: float32 [N, 4] xyxy normalized to 0..1 by frame size
+    confidence: float32 [N]
+    class_ids: int32 [N]
+    """
+    __slots__ = ("boxes", "confidence", "class_ids", "names")
+
+    def __init__(self, boxes, confidence, class_ids, names):
+        self.boxes = boxes
+        self.confidence = confidence
+        self.class_ids = class_ids
+        self.names = names
+
+    @classmethod
+    def empty(cls, names):
+        return cls(
+            np.zeros((0, 4), dtype=np.float32),
+            np.zeros((0,), dtype=np.float32),
+            np.zeros((0,), dtype=np.int32),
+            names
+        )
+
+    @classmethod
+    def concat(cls, parts, names):
+        if not parts:
+            return cls.empty(names)
+        return cls(
+            np.concatenate([p.boxes for p in parts]),
+            np.concatenate([p.confidence for p in parts]),
+            np.concatenate([p.class_ids for p in parts]),
+            names
+        )
+
+    def __len__(self):
+        return len(self.confidence)
+
+    def select(self, mask):
+        return Detections(self.boxes[mask], self.confidence[mask], self.class_ids[mask], self.names)
+
+    def filter(self, threshold=0.0, classes=None):
+        """
+        Confidence threshold and optional class-name whitelist, in array form.
+        """
+        mask = self.confidence > threshold
+        if classes is not None:
+            wanted = [cid for cid, name in self.names.items() if name in classes]
+            mask &= np.isin(self.class_ids, wanted)
+        return self.select(mask)
+
+    def remap(self, x0, y0, sx, sy):
+        """
+        Map boxes normalized to a crop back to full-frame normalized
+        coordinates; (x0, y0) is the crop origin and (sx, sy) its size,
+        all as fractions of the full frame.
+        """
+        scale = np.array([sx, sy, sx, sy], dtype=np.float32)
+        offset = np.array([x0, y0, x0, y0], dtype=np.float32)
+        return Detections(self.boxes * scale + offset, self.confidence, self.class_ids, self.names)
+
+    @property
+    def class_names(self):
+        return [self.names[int(c)] for c in self.class_ids]
+
+    def to_dicts(self):
+        """
+        Row view, only for consumers that still need per-detection dicts.
+        """
+        return [
+            {
+                "class": name,
+                "confidence": conf,
+                "bbox": {"x1": x1, "y1": y1, "x2": x2, "y2": y2}
+            }
+            for name, conf, (x1, y1, x2, y2) in zip(
+                self.class_names, self.confidence.tolist(), self.boxes.tolist()
+            )
+        ]
+
+def letterbox(frame, imgsz, auto):
+    """
+    Ultralytics LetterBox (center, scaleup, 114 padding).
+    auto=True pads only to a stride multiple (rectangular input).
+    """
+    shape = frame.shape[:2]
+    r = min(imgsz / shape[0], imgsz / shape[1])
+    new_unpad = int(round(shape[1] * r)), int(round(shape[0] * r))
+    dw, dh = imgsz - new_unpad[0], imgsz - new_unpad[1]
+    if auto:
+        dw, dh = np.mod(dw, STRIDE), np.mod(dh, STRIDE)
+    dw /= 2
+    dh /= 2
+    if shape[::-1] != new_unpad:
+        frame = cv2.resize(frame, new_unpad, interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
+    left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
+    return cv2.copyMakeBorder(frame, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(114, 114, 114))
+
+def nms(boxes, scores, iou_threshold):
+    """
+    Greedy NMS, same semantics as torchvision.ops.nms. Returns kept indices.
+    """
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    order = np.argsort(-scores, kind="stable")
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        xx1 = np.maximum(boxes[i, 0], boxes[order[1:], 0])
+        yy1 = np.maximum(boxes[i, 1], boxes[order[1:], 1])
+        xx2 = np.minimum(boxes[i, 2], boxes[order[1:], 2])
+        yy2 = np.minimum(boxes[i, 3], boxes[order[1:], 3])
+        inter = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+        iou = inter / (areas[i] + areas[order[1:]] - inter)
+        order = order[1:][iou <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+def postprocess(pred, input_shape, orig_shape):
+    """
+    One image of raw YOLOv8 output [4 + nc, N] -> (xyxy px, conf, cls) in
+    original image coordinates, as Ultralytics non_max_suppression + scale_boxes.
+    """
+    pred = pred.T
+    scores = pred[:, 4:]
+    cls = scores.argmax(1)
+    conf = scores[np.arange(len(scores)), cls]
+    keep = conf > CONF_THRESHOLD
+    pred, conf, cls = pred[keep], conf[keep], cls[keep]
+    if len(pred) > MAX_NMS:
+        top = np.argsort(-conf)[:MAX_NMS]
+        pred, conf, cls = pred[top], conf[top], cls[top]
+
+    xy, wh = pred[:, :2], pred[:, 2:4] / 2
+    boxes = np.concatenate([xy - wh, xy + wh], axis=1)
+    kept = nms(boxes + cls[:, None] * MAX_WH, conf, IOU_THRESHOLD)[:MAX_DET]
+    boxes, conf, cls = boxes[kept], conf[kept], cls[kept]
+
+    # Undo letterboxing
+    h1, w1 = input_shape
+    h0, w0 = orig_shape
+    gain = min(h1 / h0, w1 / w0)
+    pad_x = round((w1 - w0 * gain) / 2 - 0.1)
+    pad_y = round((h1 - h0 * gain) / 2 - 0.1)
+    boxes = (boxes - np.array([pad_x, pad_y, pad_x, pad_y], dtype=np.float32)) / gain
+    boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, w0)
+    boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, h0)
+    return boxes.astype(np.float32), conf.astype(np.float32), cls.astype(np.int32)
+
+class UltralyticsBackend:
+    def __init__(self, model_path):
+        import torch
+        from ultralytics import YOLO
         self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
         print(f"Loading YOLOv8 model on {self.device}...")
         self.model = YOLO(model_path)
         self.names = self.model.names
 
-    def detect(self, frame):
+    def predict(self, frames, imgsz=None):
         """
-        Run YOLOv8 inference on a single frame.
-        Returns: List of detection dicts
+        Returns: list of (xyxy px, conf, cls) per frame
         """
-        results = self.model(frame, verbose=False, device=self.device)
-        
-        detections = []
+        kwargs = {"imgsz": imgsz} if imgsz else {}
+        results = self.model(frames, verbose=False, device=self.device, **kwargs)
+        out = []
         for result in results:
+            # Pull whole tensors across once instead of per-box round trips
             boxes = result.boxes
-            for box in boxes:
-                x1, y1, x2, y2 = box.xyxy[0].tolist()
-                confidence = float(box.conf)
-                cls = int(box.cls)
-                class_name = self.names[cls]
-                
-                detections.append({
-                    "class": class_name,
-                    "confidence": confidence,
-                    "bbox": {
-                        "x1": int(x1),
-                        "y1": int(y1),
-                        "x2": int(x2),
-                        "y2": int(y2)
-                    }
-                })
-        return detections
+            if boxes is None or len(boxes) == 0:
+                out.append(None)
+                continue
+            out.append((
+                boxes.xyxy.cpu().numpy().astype(np.float32, copy=False),
+                boxes.conf.cpu().numpy().astype(np.float32, copy=False),
+                boxes.cls.cpu().numpy().astype(np.int32)
+            ))
+        return out
+
+def export_onnx(model_path, int8=False):
+    """
+    Export (once) the PyTorch weights to a dynamic-shape ONNX model, and an
+    INT8 weight-quantized copy when asked. Returns: path of the model to load
+    """
+    base = os.path.splitext(model_path)[0]
+    onnx_path = base + ".onnx"
+    if not os.path.exists(onnx_path):
+        from ultralytics import YOLO
+        print(f"Exporting {model_path} to ONNX...")
+        # dynamic axes: batching across streams and per-crop input sizes
+        onnx_path = YOLO(model_path).export(format="onnx", dynamic=True, simplify=True)
+    return quantize_onnx(onnx_path) if int8 else onnx_path
+
+def quantize_onnx(onnx_path):
+    """
+    INT8 weight-quantized copy (made once) of an ONNX model, next to it.
+    Returns: path of the quantized model
+    """
+    if onnx_path.endswith(".int8.onnx"):
+        return onnx_path
+    int8_path = os.path.splitext(onnx_path)[0] + ".int8.onnx"
+    if not os.path.exists(int8_path):
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        print(f"Quantizing {onnx_path} to INT8...")
+        quantize_dynamic(onnx_path, int8_path, weight_type=QuantType.QInt8)
+    return int8_path
+
+class OnnxRuntimeBackend:
+    def __init__(self, model_path, threads=0, int8=False, provider="CPUExecutionProvider"):
+        import onnxruntime as ort
+        if model_path.endswith(".onnx"):
+            # Prebuilt ONNX model: still honour DETECTOR_INT8
+            path = quantize_onnx(model_path) if int8 else model_path
+        else:
+            path = export_onnx(model_path, int8)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        providers = [provider, "CPUExecutionProvider"] if provider != "CPUExecutionProvider" else [provider]
+        available = ort.get_available_providers()
+        if provider not in available:
+            print(f"[!] {provider} not available, using CPUExecutionProvider")
+            providers = ["CPUExecutionProvider"]
+        print(f"Loading YOLOv8 ONNX model {path} ({providers[0]}, threads={threads or 'auto'})...")
+        self.session = ort.InferenceSession(path, options, providers=providers)
+        self.input_name = self.session.get_inputs()[0].name
+
+        # Ultralytics stores class names and export size in the model metadata
+        meta = self.session.get_modelmeta().custom_metadata_map
+        self.names = ast.literal_eval(meta["names"])
+        self.imgsz = ast.literal_eval(meta.get("imgsz", "[640, 640]"))[0]
+        self.dynamic = not isinstance(self.session.get_inputs()[0].shape[2], int)
+
+    def predict(self, frames, imgsz=None):
+        imgsz = imgsz or self.imgsz
+        if not self.dynamic:
+            imgsz = self.imgsz
+        # Same rule as the Ultralytics predictor: rectangular letterbox only
+        # when every frame in the batch has the same shape
+        auto = self.dynamic and all(f.shape == frames[0].shape for f in frames)
+        images = [letterbox(frame, imgsz, auto) for frame in frames]
+        batch = np.stack(images)[..., ::-1].transpose(0, 3, 1, 2)
+        batch = np.ascontiguousarray(batch, dtype=np.float32) / 255.0
+
+        preds = self.session.run(None, {self.input_name: batch})[0]
+        out = []
+        for pred, frame in zip(preds, frames):
+            xyxy, conf, cls = postprocess(pred, batch.shape[2:], frame.shape[:2])
+            out.append((xyxy, conf, cls) if len(conf) else None)
+        return out
+
+def create_backend(backend: str, model_path: str, threads=0, int8=False):
+    if backend == "onnxruntime":
+        return OnnxRuntimeBackend(model_path, threads, int8)
+    if backend == "openvino":
+        return OnnxRuntimeBackend(model_path, threads, int8, provider="OpenVINOExecutionProvider")
+    return UltralyticsBackend(model_path)
+
+class YoloDetector:
+    def __init__(self, model_path='yolov8n.pt', backend=None, threads=None, int8=None):
+        self.backend_name = backend or settings.DETECTOR_BACKEND
+        self.backend = create_backend(
+            self.backend_name,
+            model_path,
+            threads=settings.DETECTOR_THREADS if threads is None else threads,
+            int8=settings.DETECTOR_INT8 if int8 is None else int8
+        )
+        self.names = self.backend.names
+
+    def detect(self, frame):
+        """
+        Run YOLOv8 inference on a single frame.
+        Returns: Detections (normalized, columnar)
+        """
+        return self.detect_batch([frame])[0]
+
+    def detect_batch(self, frames, imgsz=None):
+        """
+        Run YOLOv8 inference on a list of frames in one forward pass.
+        imgsz: optional smaller input size for cropped frames
+        Returns: List of Detections, one per input frame
+        """
+        results = self.backend.predict(frames, imgsz)
+        return [self._to_detections(result, frame.shape) for result, frame in zip(results, frames)]
+
+    def _to_detections(self, result, shape):
+        if result is None:
+            return Detections.empty(self.names)
+        xyxy, conf, cls = result
+
+        # Normalize coordinates for frontend
+        h, w = shape[:2]
+        xyxy = xyxy / np.array([w, h, w, h], dtype=np.float32)
+
+        return Detections(xyxy, conf, cls, self.names)
@@ -0,0 +1,90 @@
+"""
+Detection zones from Stream.detection_zones.
+Accepted shapes: a list of zones, each either {"points": [[x, y], ...]} or a
+bare [[x, y], ...] list. Coordinates may be pixels or already normalized
+(all values <= 1). Zones are used to drop detections whose box centroid
+falls outside every zone and to crop inference to the zone rectangles.
+"""
+import numpy as np
+from services.cropping import expand_region, region_area, union_region
+
+def parse_zones(raw):
+    """
+    Returns: list of float32 [M, 2] polygons (M >= 3), raw coordinates
+    """
+    if not raw:
+        return []
+    if isinstance(raw, dict):
+        raw = raw.get("zones", [raw])
+    polygons = []
+    for zone in raw:
+        points = zone.get("points") if isinstance(zone, dict) else zone
+        try:
+            poly = np.asarray(points, dtype=np.float32).reshape(-1, 2)
+        except (TypeError, ValueError):
+            continue
+        if len(poly) >= 3:
+            polygons.append(poly)
+    return polygons
+
+def points_in_polygon(points, polygon):
+    """
+    Vectorized even-odd ray casting.
+    points: [N, 2], polygon: [M, 2] -> bool [N]
+    """
+    x = points[:, 0:1]
+    y = points[:, 1:2]
+    x1, y1 = polygon[:, 0][None, :], polygon[:, 1][None, :]
+    x2, y2 = np.roll(polygon[:, 0], -1)[None, :], np.roll(polygon[:, 1], -1)[None, :]
+    straddles = (y1 > y) != (y2 > y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_cross = (x2 - x1) * (y - y1) / (y2 - y1) + x1
+    return np.count_nonzero(straddles & (x < x_cross), axis=1) % 2 == 1
+
+class ZoneFilter:
+    def __init__(self, raw_zones, crop_max_area=0.5):
+        self.raw = parse_zones(raw_zones)
+        self.crop_max_area = crop_max_area
+        self.polygons = None # normalized, set by prepare()
+        self.tiles = None
+
+    def __bool__(self):
+        return bool(self.raw)
+
+    def prepare(self, width: int, height: int):
+        """
+        Normalize polygons for a frame size and work out the inference tiles.
+        """
+        self.polygons = [
+            poly if poly.max() <= 1.0 else poly / np.array([width, height], dtype=np.float32)
+            for poly in self.raw
+        ]
+        rects = [
+            expand_region((float(p[:, 0].min()), float(p[:, 1].min()), float(p[:, 0].max()), float(p[:, 1].max())), 0.02)
+            for p in self.polygons
+        ]
+        union = union_region(rects)
+        if union is None or region_area(union) > self.crop_max_area:
+            self.tiles = None # zones cover most of the frame: full-frame inference
+        elif len(rects) > 1 and sum(region_area(r) for r in rects) < 0.5 * region_area(union):
+            self.tiles = rects # scattered zones: one tile per zone
+        else:
+            self.tiles = [union]
+
+    def mask(self, detections):
+        """
+        Bool mask of detections whose box centroid lies inside any zone.
+        """
+        centroids = np.stack([
+            (detections.boxes[:, 0] + detections.boxes[:, 2]) / 2,
+            (detections.boxes[:, 1] + detections.boxes[:, 3]) / 2,
+        ], axis=1)
+        inside = np.zeros(len(detections), dtype=bool)
+        for poly in self.polygons:
+            inside |= points_in_polygon(centroids, poly)
+        return inside
+
+    def filter(self, detections):
+        if not self.polygons or len(detections) == 0:
+            return detections
+        return detections.select(self.mask(detections))